@@ -1,8 +1,45 @@
 from django.contrib import admin
-from .models import Bus, Seat, Booking
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
+from .models import Bus, BusSchedule, BusStop, Seat, Booking, BookingSeat, SeatOccupancy, BookingStats, Trip
+
+class BusScheduleInline(admin.StackedInline):
+    model = BusSchedule
+    can_delete = False
+
+class BusStopFormSet(BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        stops = sorted(
+            (form.cleaned_data['position'], form.cleaned_data['minutes_from_start'])
+            for form in self.forms
+            if form.cleaned_data and not form.cleaned_data.get('DELETE')
+        )
+        if [position for position, _ in stops] != list(range(1, len(stops) + 1)):
+            raise ValidationError("Stop positions must be numbered 1, 2, 3, ... without gaps.")
+        offsets = [minutes for _, minutes in stops]
+        if any(earlier >= later for earlier, later in zip(offsets, offsets[1:])):
+            raise ValidationError("Each stop must be reached later than the one before it.")
+        # bookings store stop indexes, so adding or removing stops would shift them
+        renumbered = self.deleted_forms or any(form.has_changed() for form in self.extra_forms) or any(
+            'position' in form.changed_data for form in self.initial_forms
+        )
+        if renumbered and self.instance.pk and BookingSeat.objects.filter(
+            bus=self.instance,
+            journey_date__gte=timezone.now().date(),
+            status__in=BookingSeat.ACTIVE_STATUSES,
+        ).exists():
+            raise ValidationError("Stops can't be added, removed or reordered while the bus has upcoming bookings.")
+
+class BusStopInline(admin.TabularInline):
+    model = BusStop
+    formset = BusStopFormSet
+    extra = 0
 
 class BusAdmin(admin.ModelAdmin):
     list_display = ('bus_name', 'number', 'origin', 'destination', 'start_time', 'reach_time', 'no_of_seats', 'price')
+    inlines = [BusStopInline, BusScheduleInline]
 
 class SeatAdmin(admin.ModelAdmin):
     list_display = ('bus', 'seat_number', 'last_booking_info')
@@ -22,6 +59,24 @@ class BookingAdmin(admin.ModelAdmin):
         return ", ".join([seat.seat_number for seat in obj.seats.all()])
     get_seats.short_description = "Seats"
 
+class SeatOccupancyAdmin(admin.ModelAdmin):
+    list_display = ('bus', 'journey_date', 'booked_count', 'updated_at')
+    list_filter = ('journey_date',)
+
+    def booked_count(self, obj):
+        return len(obj.booked_segments)
+    booked_count.short_description = "Booked Seats"
+
+class TripAdmin(admin.ModelAdmin):
+    list_display = ('bus', 'service_date', 'departs_at', 'arrives_at', 'status')
+    list_filter = ('status', 'service_date')
+
+class BookingStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_bookings', 'active_bookings', 'past_bookings', 'cancelled_bookings', 'as_of')
+
 admin.site.register(Bus, BusAdmin)
 admin.site.register(Seat, SeatAdmin)
 admin.site.register(Booking, BookingAdmin)
+admin.site.register(SeatOccupancy, SeatOccupancyAdmin)
+admin.site.register(BookingStats, BookingStatsAdmin)
+admin.site.register(Trip, TripAdmin)
@@ -0,0 +1,200 @@
+# travels/bookings/authentication.py
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU map whose entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Token key -> (user, token created). Each worker keeps its own copy, so a
+# revoked token can live on in other workers for up to AUTH_TOKEN_CACHE_SECONDS:
+# only used when there is no shared cache to invalidate across workers.
+_tokens = LRUCache(
+    maxsize=getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_TOKEN_CACHE_SECONDS', 60),
+)
+
+
+def _shared_key(key):
+    # never put raw tokens into the cache backend's key space
+    return f"bookings:auth-token:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+
+def _use_shared_cache():
+    return getattr(settings, 'AUTH_TOKEN_SHARED_CACHE', False)
+
+
+def lookup_token(key):
+    """
+    (user, created) for a token key, or None if there is no such token.
+    Checks the shared cache if enabled (invalidate_tokens() can't reach other
+    workers' LRUs, so they must not answer first), else the in-process LRU,
+    then the database.
+    """
+    shared = _use_shared_cache()
+    entry = cache.get(_shared_key(key)) if shared else _tokens.get(key)
+    if entry is None:
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if token is None:
+            return None
+        entry = (token.user, token.created)
+        if shared:
+            cache.set(_shared_key(key), entry, timeout=getattr(settings, 'AUTH_TOKEN_CACHE_SECONDS', 60))
+        else:
+            _tokens.set(key, entry)
+    user, created = entry
+    # callers get their own copy; the cached instance is shared across requests
+    return copy.copy(user), created
+
+
+async def alookup_token(key):
+    entry = await cache.aget(_shared_key(key)) if _use_shared_cache() else _tokens.get(key)
+    if entry is not None:
+        return copy.copy(entry[0]), entry[1]
+    return await sync_to_async(lookup_token)(key)
+
+
+def invalidate_tokens(keys):
+    """
+    Drop cached lookups for these token keys (logout, password change, user edits).
+    """
+    keys = list(keys)
+    for key in keys:
+        _tokens.delete(key)
+    if keys and _use_shared_cache():
+        cache.delete_many([_shared_key(key) for key in keys])
+
+
+def token_expired(created, now=None):
+    ttl = getattr(settings, 'AUTH_TOKEN_TTL', None)
+    if ttl is None:
+        return False
+    return created + timedelta(seconds=ttl) <= (now or timezone.now())
+
+
+def issue_token(user):
+    """
+    The user's token for login/registration: the existing one, or a fresh one
+    if it has expired.
+    """
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token.created):
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication without the per-request Token + User query: lookups
+    are served from lookup_token()'s caches and tokens older than
+    AUTH_TOKEN_TTL seconds are rejected.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = lookup_token(key)
+        if entry is None:
+            raise AuthenticationFailed('Invalid token.')
+        user, created = entry
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        if token_expired(created):
+            raise AuthenticationFailed('Token has expired.')
+        return user, Token(key=key, user=user, created=created)
+
+
+async def aget_token_user(request):
+    """
+    User for the `Authorization: Token <key>` header, for plain async Django
+    views (DRF authentication classes only run on sync views). Returns None
+    when missing, unknown, expired or inactive.
+    """
+    header = request.headers.get('Authorization', '')
+    key = header[len('Token '):] if header.startswith('Token ') else None
+    if not key:
+        return None
+    entry = await alookup_token(key)
+    if entry is None:
+        return None
+    user, created = entry
+    if not user.is_active or token_expired(created):
+        return None
+    return user
+
+
+_STREAM_TICKET_SALT = 'bookings.stream-ticket'
+
+
+def issue_stream_ticket(user, bus_id):
+    """
+    Signed ticket for one bus's seat-event stream, valid for
+    STREAM_TICKET_SECONDS. Browser EventSource can't set headers, so the
+    ticket goes in the URL instead of the long-lived token.
+    """
+    return signing.dumps({'user': user.id, 'bus': bus_id}, salt=_STREAM_TICKET_SALT)
+
+
+async def aget_ticket_user(ticket, bus_id):
+    """
+    Active user a stream ticket was issued to, or None if it is forged,
+    expired or for another bus.
+    """
+    try:
+        data = signing.loads(
+            ticket, salt=_STREAM_TICKET_SALT, max_age=getattr(settings, 'STREAM_TICKET_SECONDS', 60)
+        )
+    except signing.BadSignature:
+        return None
+    if data.get('bus') != bus_id:
+        return None
+    return await get_user_model().objects.filter(pk=data.get('user'), is_active=True).afirst()
@@ -0,0 +1,133 @@
+# travels/bookings/caching.py
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# Version tokens never expire on their own; they only move forward.
+VERSION_TIMEOUT = None
+
+
+def _search_version_key(journey_date):
+    return f"bookings:search-version:{journey_date}"
+
+
+FLEET_VERSION_KEY = "bookings:fleet-version"
+
+# free-text search params; everything else (cursor, dates) is used verbatim
+NORMALIZED_SEARCH_PARAMS = {'departure', 'destination', 'match'}
+
+
+def _bump(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # first bump for this key (or it was evicted): start a fresh counter
+        cache.add(key, 1, timeout=VERSION_TIMEOUT)
+        return cache.incr(key)
+
+
+def _bump_on_commit(key):
+    # after commit, not before: a search reading the new version must also see
+    # the new rows, or it would cache stale results under that version
+    transaction.on_commit(lambda: _bump(key))
+
+
+def bump_search_version(journey_date):
+    """
+    Mark seat state on journey_date as changed (called from every booking
+    write) once the current transaction commits. Searches are versioned per
+    date, not per listed bus: a write on a bus a search left out, say because
+    it was full, can bring it back into the results.
+    """
+    _bump_on_commit(_search_version_key(journey_date))
+
+
+def search_version(journey_date):
+    return cache.get(_search_version_key(journey_date), 0)
+
+
+def bump_fleet():
+    """
+    Mark the bus catalogue as changed (bus added, edited or removed) once
+    the current transaction commits.
+    """
+    _bump_on_commit(FLEET_VERSION_KEY)
+
+
+def fleet_version():
+    return cache.get(FLEET_VERSION_KEY, 0)
+
+
+def is_shared():
+    """
+    True when the cache is seen by every worker process. With the in-process
+    (or dummy) backend, a bump made by one worker never reaches the others.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    return backend not in (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.dummy.DummyCache',
+    )
+
+
+# materialized-trips markers are cheap to recompute, so they may expire
+TRIPS_MARKER_TIMEOUT = 24 * 60 * 60
+
+
+def _trips_key(service_date, version):
+    return f"bookings:trips-materialized:{version}:{service_date}"
+
+
+def trips_materialized(service_date, version):
+    """
+    True once Trip.materialize() has run for service_date under this fleet
+    version (Bus.objects.fleet_version(): any schedule or bus change starts a new one).
+    """
+    return cache.get(_trips_key(service_date, version)) is not None
+
+
+def mark_trips_materialized(service_date, version):
+    cache.set(_trips_key(service_date, version), True, timeout=TRIPS_MARKER_TIMEOUT)
+
+
+def search_key(host, params):
+    """
+    Cache key for a bus search: host (next links are absolute) plus the
+    normalized query parameters, under the current fleet version.
+    """
+    normalized = json.dumps({
+        key: " ".join(value.split()).casefold() if key in NORMALIZED_SEARCH_PARAMS else value
+        for key, value in sorted(params.items())
+    })
+    digest = hashlib.sha256(f"{host}|{normalized}".encode('utf-8')).hexdigest()
+    return f"bookings:bus-search:{fleet_version()}:{digest}"
+
+
+def get_search(key, version):
+    """
+    Cached search payload, or None when missing, stored under an older
+    search_version() of its date, or past a hold expiry it depended on.
+    """
+    entry = cache.get(key)
+    if entry is None or entry['version'] != version:
+        return None
+    if entry['until'] is not None and entry['until'] <= timezone.now():
+        return None
+    return entry['data']
+
+
+def set_search(key, version, data, until=None):
+    """
+    Store a search payload computed under `version` (read before the search
+    ran, so a write during it isn't missed). Holds run out without any write,
+    so `until` should be the date's next hold expiry.
+    """
+    cache.set(
+        key,
+        {'version': version, 'until': until, 'data': data},
+        timeout=getattr(settings, 'BUS_SEARCH_CACHE_SECONDS', 60),
+    )
@@ -0,0 +1,165 @@
+# travels/bookings/events.py
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def seat_channel(bus_id, journey_date):
+    return f"bookings:seats:{bus_id}:{journey_date}"
+
+
+class Subscription:
+    """
+    An active subscription to one channel: async iterator of its messages.
+    aclose() leaves the channel.
+    """
+
+    def __init__(self, receive, close):
+        self._receive = receive
+        self._close = close
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._receive()
+
+    async def aclose(self):
+        await self._close()
+
+
+class InProcessBroker:
+    """
+    Pub/sub inside one process. Subscribers are asyncio queues on the event loop
+    that serves them; publish() may be called from any thread (sync views run
+    in a worker thread under ASGI).
+    """
+    queue_size = 100
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, message)
+
+    @staticmethod
+    def _deliver(queue, message):
+        if queue.full():
+            # slow client: drop the oldest event, every event carries full seat state anyway
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def subscribe(self, channel):
+        """
+        Subscription to `channel`; every message published after this returns is delivered.
+        """
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(entry)
+
+        async def close():
+            with self._lock:
+                subscribers = self._subscribers.get(channel, [])
+                if entry in subscribers:
+                    subscribers.remove(entry)
+                if not subscribers:
+                    self._subscribers.pop(channel, None)
+
+        return Subscription(entry[1].get, close)
+
+
+class RedisBroker:
+    """
+    Pub/sub through Redis so events reach subscribers in every worker process.
+    Uses SEAT_EVENTS_REDIS_URL, falling back to REDIS_URL.
+    """
+
+    def __init__(self):
+        import redis
+
+        self.url = getattr(settings, 'SEAT_EVENTS_REDIS_URL', None) or settings.REDIS_URL
+        self._client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self._client.publish(channel, message)
+
+    async def subscribe(self, channel):
+        """
+        Subscription to `channel`, returned once Redis has confirmed it:
+        SUBSCRIBE only sends the command, and messages published before the
+        confirmation are not delivered.
+        """
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        listener = pubsub.listen()
+
+        async def close():
+            await listener.aclose()
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+        try:
+            await pubsub.subscribe(channel)
+            async for item in listener:
+                if item['type'] == 'subscribe':
+                    break
+        except BaseException:
+            await close()
+            raise
+
+        async def receive():
+            async for item in listener:
+                if item['type'] == 'message':
+                    return item['data'].decode('utf-8')
+            raise StopAsyncIteration
+
+        return Subscription(receive, close)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(
+            getattr(settings, 'SEAT_EVENTS_BROKER', 'bookings.events.InProcessBroker')
+        )()
+    return _broker
+
+
+def seat_state_message(occupancy, changed=None):
+    """
+    JSON event for one journey: full taken/held state, the taken segment mask
+    of every taken seat (for seat maps of part of the route), plus the seats that changed.
+    """
+    states = occupancy.seat_states()
+    return json.dumps({
+        'bus_id': occupancy.bus_id,
+        'journey_date': str(occupancy.journey_date),
+        'version': occupancy.version,
+        'booked': sorted(seat_id for seat_id, state in states.items() if state == 'booked'),
+        'held': sorted(seat_id for seat_id, state in states.items() if state == 'held'),
+        'segments': {str(seat_id): mask for seat_id, mask in sorted(occupancy.taken_segments().items())},
+        'changed': sorted(changed or []),
+    })
+
+
+def publish_seat_change(occupancy, changed):
+    """
+    Push a seat-state event for `occupancy` once the current transaction commits.
+    """
+    channel = seat_channel(occupancy.bus_id, occupancy.journey_date)
+    message = seat_state_message(occupancy, changed)
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
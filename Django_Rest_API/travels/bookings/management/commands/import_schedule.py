@@ -0,0 +1,165 @@
+import csv
+import json
+import time
+from datetime import datetime
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from bookings import caching
+from bookings.models import Bus, BusSchedule, Seat, Trip
+from bookings.seat_layout import build_seats, sync_seats
+from bookings.serializers.import_serializers import ScheduleRowSerializer, schedule_fields
+
+BUS_FIELDS = [
+    'bus_name', 'origin', 'destination', 'features', 'start_time', 'reach_time',
+    'no_of_seats', 'price', 'seat_type', 'seats_per_row', 'seat_numbering',
+]
+LAYOUT_FIELDS = ['no_of_seats', 'seat_type', 'seats_per_row', 'seat_numbering']
+TIME_FIELDS = ['start_time', 'reach_time']
+SCHEDULE_FIELDS = ['weekdays', 'starts_on', 'ends_on']
+# every Bus column an import row sets
+WRITTEN_FIELDS = BUS_FIELDS + ['origin_key', 'destination_key', 'departure_date']
+
+
+def read_rows(path, fmt):
+    """
+    Stream rows from a CSV (with header) or JSON-lines file as dicts.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            for row in csv.DictReader(handle):
+                yield {key: value for key, value in row.items() if value not in ('', None)}
+        else:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = "Import buses and recurring schedules from a CSV or JSON-lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Validate only, write nothing.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        batch_size = options['batch_size']
+
+        try:
+            rows = read_rows(path, fmt)
+            started = time.perf_counter()
+            totals = {'rows': 0, 'invalid': 0, 'created': 0, 'updated': 0, 'unchanged': 0}
+            line = 1
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch, line, totals, options['dry_run'])
+                line += len(batch)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['rows']} rows in {elapsed:.2f}s ({totals['rows'] / elapsed:.0f} rows/sec): "
+            f"{totals['created']} buses created, {totals['updated']} updated, {totals['unchanged']} unchanged, "
+            f"{totals['invalid']} invalid rows"
+        ))
+
+    def _import_batch(self, batch, first_line, totals, dry_run):
+        totals['rows'] += len(batch)
+        departures, schedules = {}, {}
+        # one serializer for the batch: building one per row deep-copies its fields every time
+        serializer = ScheduleRowSerializer()
+        for offset, row in enumerate(batch):
+            try:
+                row = serializer.run_validation(row)
+            except ValidationError as e:
+                totals['invalid'] += 1
+                self.stderr.write(f"Row {first_line + offset}: {json.dumps(e.detail)}")
+                continue
+            departures[row['number']] = self._bus(row)  # later rows win
+            schedules[row['number']] = schedule_fields(row)
+
+        if dry_run or not departures:
+            return
+
+        with transaction.atomic():
+            existing = Bus.objects.in_bulk(list(departures), field_name='number')
+            created = [bus for number, bus in departures.items() if number not in existing]
+            updated, resized, retimed = [], [], []
+            now = timezone.now()
+            for number, bus in departures.items():
+                current = existing.get(number)
+                # unchanged rows are not rewritten: a re-import stays cheap and
+                # keeps updated_at, so the route graph doesn't reload them
+                if current is None or all(getattr(current, field) == getattr(bus, field) for field in WRITTEN_FIELDS):
+                    continue
+                if any(getattr(current, field) != getattr(bus, field) for field in LAYOUT_FIELDS):
+                    resized.append(current)
+                if any(getattr(current, field) != getattr(bus, field) for field in TIME_FIELDS):
+                    retimed.append(current)
+                for field in WRITTEN_FIELDS:
+                    setattr(current, field, getattr(bus, field))
+                current.updated_at = now
+                updated.append(current)
+
+            # bulk_create skips Bus.post_save, so seats and schedules are written here in bulk
+            Bus.objects.bulk_create(created)
+            Seat.objects.bulk_create(
+                [seat for bus in created for seat in build_seats(bus, range(1, bus.no_of_seats + 1))]
+            )
+            Bus.objects.bulk_update(updated, WRITTEN_FIELDS + ['updated_at'])
+            for bus in resized:
+                sync_seats(bus)
+            rescheduled = self._save_schedules(created + list(existing.values()), schedules)
+            # the route planner re-reads buses by updated_at
+            Bus.objects.filter(pk__in=[bus.pk for bus in rescheduled if bus not in updated]).update(updated_at=now)
+            for bus in {bus.pk: bus for bus in retimed + rescheduled}.values():
+                Trip.resync(bus)
+            if created or updated or rescheduled:
+                # bulk writes skip the Bus and BusSchedule signals
+                caching.bump_fleet()
+
+        totals['created'] += len(created)
+        totals['updated'] += len({bus.pk for bus in updated + rescheduled})
+        totals['unchanged'] += len(existing) - len({bus.pk for bus in updated + rescheduled})
+
+    def _save_schedules(self, buses, schedules):
+        """
+        Create or update each bus's BusSchedule from its row; returns the
+        existing buses whose schedule changed.
+        """
+        existing = BusSchedule.objects.in_bulk([bus.pk for bus in buses], field_name='bus_id')
+        created, updated, changed = [], [], []
+        for bus in buses:
+            fields = schedules[bus.number]
+            schedule = existing.get(bus.pk)
+            if schedule is None:
+                created.append(BusSchedule(bus=bus, **fields))
+            elif any(getattr(schedule, field) != value for field, value in fields.items()):
+                for field, value in fields.items():
+                    setattr(schedule, field, value)
+                updated.append(schedule)
+                changed.append(bus)
+        BusSchedule.objects.bulk_create(created)
+        BusSchedule.objects.bulk_update(updated, SCHEDULE_FIELDS)
+        return changed
+
+    def _bus(self, row):
+        bus = Bus(
+            number=row['number'],
+            departure_date=timezone.make_aware(datetime.combine(row['departure_date'], row['start_time'])),
+            **{field: row[field] for field in BUS_FIELDS},
+        )
+        bus.set_route_keys()
+        return bus
@@ -0,0 +1,91 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the sync and async read endpoints of a running server side by side "
+        "(bus search, bus detail, booking history) and report throughput and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/api/')
+        parser.add_argument('--token', required=True, help="API token of the user making the requests.")
+        parser.add_argument('--user-id', type=int, required=True, help="Id of the token's user (booking history).")
+        parser.add_argument('--bus-id', type=int, required=True, help="Bus for the detail endpoint.")
+        parser.add_argument('--journey-date', required=True, help="YYYY-MM-DD used for search and seat maps.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Clients in flight at once.")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and variant.")
+        parser.add_argument(
+            '--client-delay', type=float, default=0.0,
+            help="Seconds each client waits before reading the response, to mimic slow clients.",
+        )
+
+    def handle(self, *args, **options):
+        base = options['base_url'].rstrip('/') + '/'
+        paths = {
+            'bus search': f"buses/?journey_date={options['journey_date']}",
+            'bus detail': f"buses/{options['bus_id']}/?journey_date={options['journey_date']}",
+            'booking history': f"user/{options['user_id']}/bookings/",
+        }
+        self.stdout.write(
+            f"{'endpoint':<16} {'variant':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>6}"
+        )
+        for name, path in paths.items():
+            for variant, url in (('sync', base + path), ('async', base + 'async/' + path)):
+                result = asyncio.run(self.run(url, options))
+                self.stdout.write(
+                    f"{name:<16} {variant:<6} {result['rate']:>8.1f} {result['p50']:>8.1f} "
+                    f"{result['p95']:>8.1f} {result['max']:>8.1f} {result['errors']:>6}"
+                )
+
+    async def run(self, url, options):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise CommandError("Only plain http:// servers are supported")
+        request = (
+            f"GET {parts.path}?{parts.query} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"Authorization: Token {options['token']}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode('ascii')
+        host, port = parts.hostname, parts.port or 80
+        remaining = iter(range(options['requests']))
+        latencies, errors = [], 0
+
+        async def client():
+            nonlocal errors
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    reader, writer = await asyncio.open_connection(host, port)
+                    writer.write(request)
+                    await writer.drain()
+                    if options['client_delay']:
+                        await asyncio.sleep(options['client_delay'])
+                    status_line = await reader.readline()
+                    await reader.read()
+                    writer.close()
+                    if status_line.split()[1] not in (b'200', b'304'):
+                        errors += 1
+                        continue
+                except (OSError, IndexError):
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+        elapsed = time.perf_counter() - started
+        ordered = sorted(latencies) or [0.0]
+        return {
+            'rate': len(latencies) / elapsed,
+            'p50': statistics.median(ordered),
+            'p95': ordered[int(len(ordered) * 0.95) - 1] if len(ordered) > 1 else ordered[0],
+            'max': ordered[-1],
+            'errors': errors,
+        }
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = "Release seats held by pending bookings whose hold has expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and sweep every N seconds (default: sweep once and exit).",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            released = Booking.release_expired_holds(batch_size=options['batch_size'])
+            if released or not interval:
+                self.stdout.write(f"Released {released} expired seat hold(s)")
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,89 @@
+import itertools
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from bookings.models import Bus, BusSchedule
+from bookings.routing import ConnectionGraph, Departure, MINUTES_PER_DAY, NEVER
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the route planner: build a connection graph (synthetic, or the real "
+        "fleet with --from-db), apply incremental updates and time random itinerary queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stops', type=int, default=300, help="Cities in the synthetic network.")
+        parser.add_argument('--departures', type=int, default=5000, help="Daily departures in the synthetic network.")
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--updates', type=int, default=100, help="Buses re-added to time incremental updates.")
+        parser.add_argument('--max-legs', type=int, default=3)
+        parser.add_argument('--min-transfer', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--from-db', action='store_true', help="Plan over the buses in the database instead.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        graph = ConnectionGraph()
+        started = time.perf_counter()
+        if options['from_db']:
+            graph.load(Bus.objects.select_related('schedule').prefetch_related('stops'))
+        else:
+            graph.update({d.bus_id: [d] for d in self.synthetic(rng, options['stops'], options['departures'])})
+        build_ms = (time.perf_counter() - started) * 1000
+        stops = sorted(set(graph.outgoing) | set(graph.incoming))
+        self.stdout.write(f"graph: {len(stops)} stops, {len(graph.departures)} departures, built in {build_ms:.0f} ms")
+        if len(stops) < 2:
+            self.stdout.write("Not enough stops to plan between.")
+            return
+
+        updates = rng.sample(sorted(graph.departures), min(options['updates'], len(graph.departures)))
+        started = time.perf_counter()
+        for bus_id in updates:
+            graph.update({bus_id: [d._replace(departs=d.departs + 10) for d in graph.departures[bus_id]]})
+        if updates:
+            per_update = (time.perf_counter() - started) * 1000 / len(updates)
+            self.stdout.write(f"incremental update: {per_update:.3f} ms per bus")
+
+        service_date = date.today() + timedelta(days=1)
+        timings, found, connecting = [], 0, 0
+        for _ in range(options['queries']):
+            origin, destination = rng.sample(stops, 2)
+            started = time.perf_counter()
+            plans = graph.plan(
+                origin, destination, service_date, after=rng.randrange(0, 18 * 60),
+                min_transfer=options['min_transfer'], max_legs=options['max_legs'],
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+            found += bool(plans)
+            connecting += any(len(legs) > 1 for legs in plans)
+
+        timings.sort()
+        self.stdout.write(
+            f"{len(timings)} queries: p50 {statistics.median(timings):.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, max {timings[-1]:.2f} ms; "
+            f"{found} with itineraries, {connecting} with connections"
+        )
+
+    @staticmethod
+    def synthetic(rng, stops, departures):
+        """
+        Random network where a few hub cities carry most of the traffic,
+        like a real intercity bus network.
+        """
+        cities = [f"city {n}" for n in range(stops)]
+        weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(stops)))
+        starts_on = (date.today() - timedelta(days=30)).toordinal()
+        for bus_id in range(1, departures + 1):
+            origin, destination = rng.choices(cities, cum_weights=weights, k=2)
+            while destination == origin:
+                destination = rng.choice(cities)
+            weekdays = BusSchedule.ALL_DAYS if rng.random() < 0.8 else rng.randrange(1, BusSchedule.ALL_DAYS)
+            yield Departure(
+                bus_id, origin, destination, rng.randrange(0, MINUTES_PER_DAY, 5), rng.randrange(45, 12 * 60, 5),
+                weekdays, starts_on, NEVER, 500, 0, 1,
+            )
@@ -0,0 +1,51 @@
+import time
+
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+from django.test.utils import CaptureQueriesContext
+
+from bookings.models import Bus, Seat
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark bus creation with seat generation: create --buses buses of --seats seats "
+        "each through the ORM (signals included) and report time and queries. "
+        "Everything is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buses', type=int, default=1000)
+        parser.add_argument('--seats', type=int, default=60)
+        parser.add_argument('--seats-per-row', type=int, default=4)
+        parser.add_argument('--keep', action='store_true', help="Commit the buses instead of rolling back.")
+
+    def handle(self, *args, **options):
+        prefix = f"BENCH-{int(time.time())}-"
+        try:
+            with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for index in range(options['buses']):
+                    Bus.objects.create(
+                        bus_name=f"Benchmark {index}", number=f"{prefix}{index}",
+                        origin='Benchmark City', destination='Other City',
+                        start_time='08:00', reach_time='12:00', price=100,
+                        no_of_seats=options['seats'], seats_per_row=options['seats_per_row'],
+                    )
+                elapsed = time.perf_counter() - started
+                seats = Seat.objects.filter(bus__number__startswith=prefix).count()
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+        buses = options['buses']
+        self.stdout.write(
+            f"{buses} buses, {seats} seats in {elapsed:.2f}s "
+            f"({elapsed * 1000 / max(buses, 1):.2f} ms and {len(queries) / max(buses, 1):.1f} queries per bus)"
+            + ("" if options['keep'] else "; rolled back")
+        )
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_alter_seat_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('journey_date', models.DateField()),
+                ('booked_seat_ids', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancies', to='bookings.bus')),
+            ],
+            options={
+                'unique_together': {('bus', 'journey_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:07
+
+from django.db import migrations, models
+
+
+def fill_route_keys(apps, schema_editor):
+    Bus = apps.get_model('bookings', 'Bus')
+    buses = list(Bus.objects.only('id', 'origin', 'destination'))
+    for bus in buses:
+        bus.origin_key = " ".join(bus.origin.split()).casefold()
+        bus.destination_key = " ".join(bus.destination.split()).casefold()
+    Bus.objects.bulk_update(buses, ['origin_key', 'destination_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_seatoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bus',
+            name='destination_key',
+            field=models.CharField(default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='bus',
+            name='origin_key',
+            field=models.CharField(default='', editable=False, max_length=50),
+        ),
+        migrations.RunPython(fill_route_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bus',
+            index=models.Index(fields=['origin_key', 'destination_key'], name='bus_route_key_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='bus',
+            index=models.Index(fields=['destination_key'], name='bus_destination_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,84 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_seat_links(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingSeat = apps.get_model('bookings', 'BookingSeat')
+    for booking in Booking.objects.only('id', 'bus_id', 'journey_date', 'status').iterator():
+        BookingSeat.objects.filter(booking_id=booking.id).update(
+            bus_id=booking.bus_id,
+            journey_date=booking.journey_date,
+            status=booking.status,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_bus_route_keys'),
+    ]
+
+    operations = [
+        # Reuse the existing auto-created M2M table as the explicit through model.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='BookingSeat',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_links', to='bookings.booking')),
+                        ('seat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_links', to='bookings.seat')),
+                    ],
+                    options={
+                        'db_table': 'bookings_booking_seats',
+                        'unique_together': {('booking', 'seat')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='booking',
+                    name='seats',
+                    field=models.ManyToManyField(related_name='bookings', through='bookings.BookingSeat', to='bookings.seat'),
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.AddField(
+            model_name='bookingseat',
+            name='bus',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='booking_seats', to='bookings.bus'),
+        ),
+        migrations.AddField(
+            model_name='bookingseat',
+            name='journey_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='bookingseat',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed')], default='confirmed', max_length=20),
+        ),
+        migrations.RunPython(fill_seat_links, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='bookingseat',
+            name='bus',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_seats', to='bookings.bus'),
+        ),
+        migrations.AlterField(
+            model_name='bookingseat',
+            name='journey_date',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['bus', 'journey_date', 'status'], name='booking_bus_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingseat',
+            index=models.Index(fields=['bus', 'journey_date', 'status'], name='bookingseat_bus_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookingseat',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'confirmed')), fields=('seat', 'journey_date'), name='unique_confirmed_seat_per_date'),
+        ),
+    ]
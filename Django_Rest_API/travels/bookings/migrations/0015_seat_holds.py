@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0014_bookingseat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='bookingseat',
+            name='unique_confirmed_seat_per_date',
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bookingseat',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='seatoccupancy',
+            name='held_seats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'hold_expires_at'], name='booking_hold_expiry_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookingseat',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['confirmed', 'pending'])), fields=('seat', 'journey_date'), name='unique_active_seat_per_date'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:13
+
+from django.db import migrations, models
+
+
+def fill_seat_positions(apps, schema_editor):
+    Seat = apps.get_model('bookings', 'Seat')
+    seats_by_bus = {}
+    for seat in Seat.objects.only('id', 'bus_id', 'seat_number').order_by('id'):
+        seats_by_bus.setdefault(seat.bus_id, []).append(seat)
+
+    def sort_key(seat):
+        # existing seats were generated as S1..Sn; anything else goes after, by id
+        digits = seat.seat_number[1:]
+        return (0, int(digits), seat.id) if digits.isdigit() else (1, 0, seat.id)
+
+    updated = []
+    for seats in seats_by_bus.values():
+        for position, seat in enumerate(sorted(seats, key=sort_key), start=1):
+            seat.position = position
+            seat.row, seat.column = (position - 1) // 4 + 1, (position - 1) % 4 + 1
+            updated.append(seat)
+    Seat.objects.bulk_update(updated, ['position', 'row', 'column'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0015_seat_holds'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='seat',
+            options={'ordering': ['position', 'seat_number']},
+        ),
+        migrations.AddField(
+            model_name='bus',
+            name='seat_numbering',
+            field=models.CharField(choices=[('sequential', 'Sequential'), ('row_letter', 'Row and letter')], default='sequential', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='bus',
+            name='seat_type',
+            field=models.CharField(choices=[('seater', 'Seater'), ('sleeper', 'Sleeper')], default='seater', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='bus',
+            name='seats_per_row',
+            field=models.PositiveSmallIntegerField(default=4),
+        ),
+        migrations.AddField(
+            model_name='seat',
+            name='column',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='seat',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='seat',
+            name='row',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_seat_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0016_seat_layout'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-booking_time', '-id'], name='booking_user_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bus',
+            index=models.Index(fields=['departure_date', 'id'], name='bus_departure_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('bookings', '0017_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='booking_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_bookings', models.PositiveIntegerField(default=0)),
+                ('active_bookings', models.PositiveIntegerField(default=0)),
+                ('past_bookings', models.PositiveIntegerField(default=0)),
+                ('cancelled_bookings', models.PositiveIntegerField(default=0)),
+                ('as_of', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
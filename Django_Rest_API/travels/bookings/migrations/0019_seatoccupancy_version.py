@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0018_bookingstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seatoccupancy',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def add_daily_schedules(apps, schema_editor):
+    # Every bus was bookable on any date before schedules existed: keep that,
+    # starting from its first departure, creation or booked date
+    Bus = apps.get_model('bookings', 'Bus')
+    Booking = apps.get_model('bookings', 'Booking')
+    BusSchedule = apps.get_model('bookings', 'BusSchedule')
+    first_booked = dict(
+        Booking.objects.values('bus_id').annotate(first=Min('journey_date')).values_list('bus_id', 'first')
+    )
+    schedules = []
+    for bus_id, departure, created in Bus.objects.values_list('id', 'departure_date', 'created_at'):
+        dates = [value.date() for value in (departure, created) if value] + [first_booked.get(bus_id)]
+        schedules.append(BusSchedule(bus_id=bus_id, starts_on=min(date for date in dates if date)))
+    BusSchedule.objects.bulk_create(schedules, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0019_seatoccupancy_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.PositiveSmallIntegerField(default=127)),
+                ('starts_on', models.DateField()),
+                ('ends_on', models.DateField(blank=True, null=True)),
+                ('bus', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='bookings.bus')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_date', models.DateField()),
+                ('departs_at', models.DateTimeField()),
+                ('arrives_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('cancelled', 'Cancelled')], default='scheduled', max_length=10)),
+                ('bus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trips', to='bookings.bus')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['service_date', 'status'], name='trip_date_status_idx')],
+                'unique_together': {('bus', 'service_date')},
+            },
+        ),
+        migrations.RunPython(add_daily_schedules, migrations.RunPython.noop),
+    ]
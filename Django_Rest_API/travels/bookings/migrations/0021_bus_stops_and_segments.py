@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def whole_route_segments(apps, schema_editor):
+    # No bus has intermediate stops yet, so every existing booking covers
+    # segment 0 (stop 0 -> stop 1), the BookingSeat.segments default
+    Booking = apps.get_model('bookings', 'Booking')
+    SeatOccupancy = apps.get_model('bookings', 'SeatOccupancy')
+    Booking.objects.update(to_stop=1)
+    for occupancy in SeatOccupancy.objects.iterator():
+        occupancy.booked_segments = {str(seat_id): 1 for seat_id in occupancy.booked_seat_ids}
+        occupancy.held_segments = {
+            seat_id: [[1, expires_at]] for seat_id, expires_at in occupancy.held_seats.items()
+        }
+        occupancy.save(update_fields=['booked_segments', 'held_segments'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0020_schedules_and_trips'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusStop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('city', models.CharField(max_length=50)),
+                ('city_key', models.CharField(default='', editable=False, max_length=50)),
+                ('minutes_from_start', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='from_stop',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='to_stop',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bookingseat',
+            name='segments',
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='seatoccupancy',
+            name='booked_segments',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='seatoccupancy',
+            name='held_segments',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(whole_route_segments, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='bookingseat',
+            name='unique_active_seat_per_date',
+        ),
+        migrations.RemoveField(
+            model_name='seatoccupancy',
+            name='booked_seat_ids',
+        ),
+        migrations.RemoveField(
+            model_name='seatoccupancy',
+            name='held_seats',
+        ),
+        migrations.AddIndex(
+            model_name='bookingseat',
+            index=models.Index(fields=['seat', 'journey_date'], name='bookingseat_seat_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='busstop',
+            name='bus',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stops', to='bookings.bus'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='busstop',
+            unique_together={('bus', 'position')},
+        ),
+    ]
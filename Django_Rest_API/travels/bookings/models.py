@@ -1,31 +1,151 @@
 # travels/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from datetime import timedelta
+from django.db.models.functions import Coalesce, Greatest
+from asgiref.sync import sync_to_async
+from . import caching, events
+from datetime import datetime, timedelta
 
 def get_default_departure():
     return timezone.now() + timedelta(days=1)
 
+def normalize_city(name):
+    """
+    Canonical search key for a city name: trimmed, single-spaced, casefolded.
+    """
+    return " ".join((name or "").split()).casefold()
+
+def segment_mask(from_stop, to_stop):
+    """
+    Bitmask of the route segments from one stop index to a later one:
+    bit i is the stretch between stop i and stop i + 1.
+    """
+    return (1 << to_stop) - (1 << from_stop)
+
+class BusQuerySet(models.QuerySet):
+    def on_route(self, origin=None, destination=None, exact=False):
+        """
+        Filter on the indexed, normalized city keys.
+        Prefix match by default (autocomplete-friendly), exact match when exact=True.
+        """
+        lookup = 'exact' if exact else 'startswith'
+        if origin:
+            self = self.filter(**{f'origin_key__{lookup}': normalize_city(origin)})
+        if destination:
+            self = self.filter(**{f'destination_key__{lookup}': normalize_city(destination)})
+        return self
+
+    def with_availability(self, journey_date):
+        """
+        Annotate `booked_seats_count`, `seats_available` and `is_full` for
+        journey_date in the same SQL query (correlated subquery on booked seats).
+        """
+        booked = (
+            BookingSeat.objects.filter(
+                BookingSeat.occupying(),
+                bus=models.OuterRef('pk'),
+                journey_date=journey_date,
+            )
+            .order_by()
+            .values('bus')
+            # a seat sold in several segments still counts once
+            .annotate(total=models.Count('seat_id', distinct=True))
+            .values('total')
+        )
+        return self.annotate(
+            booked_seats_count=Coalesce(models.Subquery(booked, output_field=models.IntegerField()), 0),
+        ).annotate(
+            seats_available=Greatest(models.F('no_of_seats') - models.F('booked_seats_count'), 0),
+            is_full=models.Case(
+                models.When(no_of_seats__lte=models.F('booked_seats_count'), then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+        )
+
+    def fleet_version(self):
+        """
+        Fleet version every worker agrees on: the shared cache counter, or
+        without a shared cache (other workers' bumps never reach this process)
+        the newest bus edit plus the bus count, which also moves on deletes.
+        Schedule and stop edits touch their bus's updated_at.
+        """
+        if caching.is_shared():
+            return caching.fleet_version()
+        fleet = self.aggregate(latest=models.Max('updated_at'), count=models.Count('id'))
+        return f"{fleet['latest'].timestamp() if fleet['latest'] else 0}-{fleet['count']}"
+
+
 class Bus(models.Model):
+    SEATER = 'seater'
+    SLEEPER = 'sleeper'
+    SEAT_TYPE_CHOICES = (
+        (SEATER, 'Seater'),
+        (SLEEPER, 'Sleeper'),
+    )
+
+    NUMBERING_SEQUENTIAL = 'sequential'  # S1, S2, ... (B1, B2, ... for sleepers)
+    NUMBERING_ROW_LETTER = 'row_letter'  # 1A, 1B, 2A, ...
+    NUMBERING_CHOICES = (
+        (NUMBERING_SEQUENTIAL, 'Sequential'),
+        (NUMBERING_ROW_LETTER, 'Row and letter'),
+    )
+
     bus_name = models.CharField(max_length=100)
     number = models.CharField(max_length=20, unique=True)
     origin = models.CharField(max_length=50)
     destination = models.CharField(max_length=50)
+    # normalized copies of origin/destination used for indexed search
+    origin_key = models.CharField(max_length=50, editable=False, default='')
+    destination_key = models.CharField(max_length=50, editable=False, default='')
     features = models.TextField(blank=True)
     start_time = models.TimeField()
     reach_time = models.TimeField()
     departure_date = models.DateTimeField(default=get_default_departure)
     no_of_seats = models.PositiveIntegerField()
+    # seat layout used when seats are generated (see seat_layout.py)
+    seat_type = models.CharField(max_length=10, choices=SEAT_TYPE_CHOICES, default=SEATER)
+    seats_per_row = models.PositiveSmallIntegerField(default=4)
+    seat_numbering = models.CharField(max_length=20, choices=NUMBERING_CHOICES, default=NUMBERING_SEQUENTIAL)
     price = models.DecimalField(max_digits=8, decimal_places=2)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = BusQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL serve LIKE 'prefix%' from the index
+            models.Index(
+                fields=['origin_key', 'destination_key'], name='bus_route_key_idx',
+                opclasses=['varchar_pattern_ops', 'varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['destination_key'], name='bus_destination_key_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            # keyset pagination order for bus search
+            models.Index(fields=['departure_date', 'id'], name='bus_departure_idx'),
+        ]
+
     def __str__(self):
         return f"{self.bus_name} ({self.number})"
 
+    def set_route_keys(self):
+        self.origin_key = normalize_city(self.origin)
+        self.destination_key = normalize_city(self.destination)
+
+    def save(self, *args, **kwargs):
+        self.set_route_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'origin', 'destination'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'origin_key', 'destination_key'}
+        super().save(*args, **kwargs)
+
     def available_seats(self, journey_date=None):
         """
         Return number of seats available for given journey_date.
@@ -34,12 +154,8 @@ class Bus(models.Model):
         if journey_date is None:
             journey_date = timezone.now().date()
 
-        # Count number of confirmed seats booked for this bus & date
-        booked_count = Booking.objects.filter(
-            bus=self,
-            journey_date=journey_date,
-            status='confirmed'
-        ).aggregate(total=models.Count('seats'))['total'] or 0
+        # Booked and held seats come from the materialized occupancy row (one read)
+        booked_count = len(SeatOccupancy.for_journey(self, journey_date).taken_set())
 
         # available seats = total seats - booked seats
         return max(0, self.no_of_seats - booked_count)
@@ -48,28 +164,246 @@ class Bus(models.Model):
     def is_full_today(self):
         return self.available_seats() <= 0
 
+    def bookable_seats(self):
+        """
+        Seats in the current layout. Seats past no_of_seats only remain while
+        they carry upcoming bookings (see seat_layout.sync_seats) and can't be booked.
+        """
+        return [seat for seat in self.seats.all() if seat.position <= self.no_of_seats]
+
+    def route_stops(self):
+        """
+        Stop names by stop index: origin, the intermediate stops, destination.
+        """
+        return [self.origin] + [stop.city for stop in self.stops.all()] + [self.destination]
+
+    @property
+    def last_stop(self):
+        """
+        Stop index of the destination.
+        """
+        return len(self.stops.all()) + 1
+
 
 class Seat(models.Model):
     bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='seats')
     seat_number = models.CharField(max_length=10)
+    # 1-based place in the bus layout, and its row/column derived from seats_per_row
+    position = models.PositiveIntegerField(default=0)
+    row = models.PositiveSmallIntegerField(default=0)
+    column = models.PositiveSmallIntegerField(default=0)
 
     class Meta:
         unique_together = ['bus', 'seat_number']
-        ordering = ['seat_number']
+        ordering = ['position', 'seat_number']
 
     def __str__(self):
         return f"{self.bus.number} - {self.seat_number}"
 
     def is_available(self, journey_date):
         """
-        Returns True if this seat is NOT booked (confirmed) for given journey_date.
+        Returns True if this seat is NOT booked (confirmed) or held for given journey_date.
         """
-        return not Booking.objects.filter(
-            seats=self,
-            bus=self.bus,
-            journey_date=journey_date,
-            status='confirmed'
-        ).exists()
+        return self.pk not in SeatOccupancy.for_journey(self.bus_id, journey_date).taken_set()
+
+
+class BusStop(models.Model):
+    """
+    An intermediate stop on a bus's route. The origin is stop 0, these are
+    stops 1..n in `position` order and the destination is stop n + 1;
+    a booking covers the segments between two of those stop indexes.
+    """
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='stops')
+    position = models.PositiveSmallIntegerField()
+    city = models.CharField(max_length=50)
+    city_key = models.CharField(max_length=50, editable=False, default='')
+    # scheduled arrival, in minutes after the bus leaves its origin
+    minutes_from_start = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['position']
+        unique_together = ['bus', 'position']
+
+    def __str__(self):
+        return f"{self.bus.number} stop {self.position}: {self.city}"
+
+    def save(self, *args, **kwargs):
+        self.city_key = normalize_city(self.city)
+        super().save(*args, **kwargs)
+
+
+class BusSchedule(models.Model):
+    """
+    When a bus runs: on the weekdays in `weekdays` (bit 0 = Monday) from
+    starts_on through ends_on (open-ended when null). Trips are not stored
+    ahead of time; Trip.materialize() creates a date's trips from these rows
+    the first time that date is searched or booked.
+    """
+    ALL_DAYS = 0b1111111
+
+    bus = models.OneToOneField(Bus, on_delete=models.CASCADE, related_name='schedule')
+    weekdays = models.PositiveSmallIntegerField(default=ALL_DAYS)
+    starts_on = models.DateField()
+    ends_on = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.bus.number}: {self.starts_on} - {self.ends_on or 'open'}"
+
+    @staticmethod
+    def weekday_mask(weekdays):
+        """
+        Bitmask for an iterable of weekday numbers (Monday = 0).
+        """
+        mask = 0
+        for day in weekdays:
+            mask |= 1 << day
+        return mask
+
+    def runs_on(self, date):
+        if date < self.starts_on or (self.ends_on and date > self.ends_on):
+            return False
+        return bool(self.weekdays & (1 << date.weekday()))
+
+    @classmethod
+    def running_on(cls, date):
+        """
+        Schedules with a departure on `date`, weekday tested in SQL.
+        """
+        return (
+            cls.objects.filter(starts_on__lte=date)
+            .filter(models.Q(ends_on__isnull=True) | models.Q(ends_on__gte=date))
+            .annotate(runs_today=models.F('weekdays').bitand(1 << date.weekday()))
+            .filter(runs_today__gt=0)
+        )
+
+
+class Trip(models.Model):
+    """
+    One departure of a bus on one date, materialized from its BusSchedule.
+    Search and booking for a date only look at that date's trip rows.
+    """
+    STATUS_SCHEDULED = 'scheduled'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = (
+        (STATUS_SCHEDULED, 'Scheduled'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    )
+
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='trips')
+    service_date = models.DateField()
+    departs_at = models.DateTimeField()
+    arrives_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_SCHEDULED)
+
+    class Meta:
+        unique_together = ['bus', 'service_date']
+        indexes = [
+            models.Index(fields=['service_date', 'status'], name='trip_date_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.bus.number} on {self.service_date}"
+
+    def set_times(self, bus):
+        departs = datetime.combine(self.service_date, bus.start_time)
+        arrives = datetime.combine(self.service_date, bus.reach_time)
+        if arrives <= departs:
+            arrives += timedelta(days=1)  # overnight
+        self.departs_at = timezone.make_aware(departs)
+        self.arrives_at = timezone.make_aware(arrives)
+
+    @classmethod
+    def resync(cls, bus):
+        """
+        Bring a bus's materialized future trips in line with its schedule and
+        times after either changes: retime the ones that still run, drop the
+        rest (cancel instead when they already have bookings).
+        """
+        schedule = BusSchedule.objects.filter(bus=bus).first()
+        today = timezone.now().date()
+        retimed, dropped = [], []
+        for trip in cls.objects.filter(bus=bus, service_date__gte=today).select_related('bus'):
+            if schedule is not None and schedule.runs_on(trip.service_date):
+                trip.set_times(trip.bus)
+                trip.status = cls.STATUS_SCHEDULED
+                retimed.append(trip)
+            else:
+                dropped.append(trip)
+        cls.objects.bulk_update(retimed, ['departs_at', 'arrives_at', 'status'])
+        if not dropped:
+            return
+        booked = set(
+            BookingSeat.objects.filter(
+                bus=bus,
+                journey_date__in=[trip.service_date for trip in dropped],
+                status__in=BookingSeat.ACTIVE_STATUSES,
+            ).values_list('journey_date', flat=True)
+        )
+        cls.objects.filter(pk__in=[trip.pk for trip in dropped if trip.service_date in booked]).update(
+            status=cls.STATUS_CANCELLED
+        )
+        cls.objects.filter(pk__in=[trip.pk for trip in dropped if trip.service_date not in booked]).delete()
+
+    @classmethod
+    def materialize(cls, service_date):
+        """
+        Make sure every scheduled departure on service_date has its trip row:
+        one schedule query and one INSERT ... ON CONFLICT DO NOTHING, skipped
+        entirely once done for the current fleet version.
+        """
+        # read before the schedules, so a bus added meanwhile starts a new version
+        version = Bus.objects.fleet_version()
+        if caching.trips_materialized(service_date, version):
+            return
+        trips = []
+        for schedule in BusSchedule.running_on(service_date).select_related('bus').only(
+            'bus__id', 'bus__start_time', 'bus__reach_time'
+        ):
+            trip = cls(bus_id=schedule.bus_id, service_date=service_date)
+            trip.set_times(schedule.bus)
+            trips.append(trip)
+        cls.objects.bulk_create(trips, ignore_conflicts=True)
+        caching.mark_trips_materialized(service_date, version)
+
+    @classmethod
+    def for_journey(cls, bus, service_date):
+        """
+        The bus's trip on service_date, materialized on demand, or None if the
+        bus doesn't run that day.
+        """
+        trip = cls.objects.filter(bus=bus, service_date=service_date).first()
+        if trip is not None:
+            return trip
+        schedule = BusSchedule.objects.filter(bus=bus).select_related('bus').first()
+        if schedule is None or not schedule.runs_on(service_date):
+            return None
+        trip = cls(bus=schedule.bus, service_date=service_date)
+        trip.set_times(schedule.bus)
+        cls.objects.bulk_create([trip], ignore_conflicts=True)
+        return cls.objects.get(bus=bus, service_date=service_date)
+
+
+class BookingQuerySet(models.QuerySet):
+    def for_history(self):
+        """
+        Everything a booking list needs in a fixed number of queries: bus and user
+        joined, seats and the buses' stops prefetched, and `total_price` computed in SQL.
+        """
+        return self.select_related('bus', 'user').prefetch_related(
+            models.Prefetch('seats', queryset=Seat.objects.only('id', 'bus_id', 'seat_number', 'position')),
+            'bus__stops',
+        ).with_total_price()
+
+    def with_total_price(self):
+        """
+        Annotate `total_price`: the bus's seat price times the booking's seat count.
+        """
+        return self.annotate(
+            total_price=models.ExpressionWrapper(
+                models.F('bus__price') * models.Count('seat_links'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
 
 
 class Booking(models.Model):
@@ -88,19 +422,33 @@ class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='bookings')
     # Multiple seats per booking:
-    seats = models.ManyToManyField(Seat, related_name='bookings')
+    seats = models.ManyToManyField(Seat, related_name='bookings', through='BookingSeat')
 
     booking_time = models.DateTimeField(auto_now_add=True)
     journey_date = models.DateField()
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_CONFIRMED)
+    # stop indexes the passenger travels between (see BusStop); to_stop
+    # defaults to the bus's destination on save
+    from_stop = models.PositiveSmallIntegerField(default=0)
+    to_stop = models.PositiveSmallIntegerField(null=True, blank=True)
+    # set while a pending booking holds its seats during checkout
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
     cancellation_reason = models.TextField(blank=True)
 
+    objects = BookingQuerySet.as_manager()
+
     class Meta:
         ordering = ['-booking_time']
-        # Can't create a DB-level conditional unique constraint across a M2M easily,
-        # so we validate conflicts in clean()/save() at application level.
+        indexes = [
+            models.Index(fields=['bus', 'journey_date', 'status'], name='booking_bus_date_status_idx'),
+            models.Index(fields=['status', 'hold_expires_at'], name='booking_hold_expiry_idx'),
+            # keyset pagination order for a user's booking history
+            models.Index(fields=['user', '-booking_time', '-id'], name='booking_user_history_idx'),
+        ]
+        # Seat conflicts are checked against BookingSeat segment masks under
+        # the journey's SeatOccupancy lock (see assign_seats and save).
 
     def __str__(self):
         seat_list = ", ".join([s.seat_number for s in self.seats.all()]) if self.pk else "N/A"
@@ -113,32 +461,147 @@ class Booking(models.Model):
 
     @property
     def origin(self):
-        return self.bus.origin
+        return self.bus.route_stops()[self.from_stop]
 
     @property
     def destination(self):
-        return self.bus.destination
+        return self.bus.route_stops()[self.to_stop]
+
+    @property
+    def segments(self):
+        return segment_mask(self.from_stop, self.to_stop)
 
     @property
     def can_cancel(self):
         return self.status not in [self.STATUS_CANCELLED, self.STATUS_COMPLETED]
 
+    @property
+    def hold_expired(self):
+        return (
+            self.status == self.STATUS_PENDING
+            and self.hold_expires_at is not None
+            and self.hold_expires_at <= timezone.now()
+        )
+
     def cancel_booking(self, reason=''):
         if not self.can_cancel:
             raise ValueError("This booking cannot be cancelled")
         self.status = self.STATUS_CANCELLED
+        self.hold_expires_at = None
         self.cancelled_at = timezone.now()
         self.cancellation_reason = reason
         self.save()
         return True
 
+    def confirm_booking(self):
+        if self.status == self.STATUS_CONFIRMED:
+            return True
+        if self.status != self.STATUS_PENDING:
+            raise ValueError("Only pending bookings can be confirmed")
+        if self.hold_expired:
+            raise ValueError("Seat hold has expired")
+        self.status = self.STATUS_CONFIRMED
+        self.hold_expires_at = None
+        self.save()
+        return True
+
     def complete_booking(self):
         if self.status not in [self.STATUS_CONFIRMED, self.STATUS_PENDING]:
             raise ValueError("Only confirmed or pending bookings can be completed")
         self.status = self.STATUS_COMPLETED
+        self.hold_expires_at = None
         self.save()
         return True
 
+    @staticmethod
+    def hold_deadline():
+        return timezone.now() + timedelta(seconds=getattr(settings, 'SEAT_HOLD_SECONDS', 600))
+
+    @classmethod
+    def release_expired_holds(cls, bus=None, journey_date=None, batch_size=500):
+        """
+        Cancel pending bookings whose seat hold has run out and free their seats.
+        Pass bus and journey_date to release a single journey only.
+        Uses the (status, hold_expires_at) index, so it never scans settled bookings.
+        Returns the number of bookings released.
+        """
+        now = timezone.now()
+        expired = cls.objects.filter(status=cls.STATUS_PENDING, hold_expires_at__lte=now)
+        if bus is not None:
+            expired = expired.filter(bus=bus, journey_date=journey_date)
+
+        released = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    expired.order_by('hold_expires_at')
+                    .values_list('pk', 'bus_id', 'journey_date', 'user_id')[:batch_size]
+                )
+                if not rows:
+                    break
+                ids = [pk for pk, _, _, _ in rows]
+                cls.objects.filter(pk__in=ids, status=cls.STATUS_PENDING).update(
+                    status=cls.STATUS_CANCELLED,
+                    hold_expires_at=None,
+                    cancelled_at=now,
+                    cancellation_reason='Seat hold expired',
+                )
+                # only rows still pending: a payment may have confirmed the booking meanwhile
+                BookingSeat.objects.filter(booking_id__in=ids, status=cls.STATUS_PENDING).update(
+                    status=cls.STATUS_CANCELLED,
+                    hold_expires_at=None,
+                )
+                # queryset updates skip signals, so refresh occupancy and stats here
+                for bus_id, date in {(bus_id, date) for _, bus_id, date, _ in rows}:
+                    SeatOccupancy.rebuild(bus_id, date)
+                for user_id in {user_id for _, _, _, user_id in rows}:
+                    BookingStats.refresh(user_id)
+            released += len(ids)
+        return released
+
+    @classmethod
+    def next_hold_expiry(cls, journey_date):
+        """
+        When the next running hold on journey_date runs out, or None. Seats
+        come free at that moment without any write, so caches of the date's
+        availability must not outlive it.
+        """
+        return cls.objects.filter(
+            status=cls.STATUS_PENDING, journey_date=journey_date, hold_expires_at__gt=timezone.now()
+        ).aggregate(next=models.Min('hold_expires_at'))['next']
+
+    @classmethod
+    def confirm_paid(cls, booking_ids):
+        """
+        Promote paid pending bookings to confirmed in one short transaction:
+        the booking rows are locked, then bookings and their seat rows are
+        flipped with one UPDATE each. A hold that ran out but was not released
+        yet still owns its seats, so it is confirmed too. Bookings that are no
+        longer pending are left alone, so replaying a confirmation is a no-op.
+        Returns the ids that were confirmed.
+        """
+        with transaction.atomic():
+            rows = list(
+                cls.objects.select_for_update()
+                .filter(pk__in=booking_ids, status=cls.STATUS_PENDING)
+                .order_by('pk')
+                .values_list('pk', 'bus_id', 'journey_date', 'user_id')
+            )
+            if not rows:
+                return []
+            ids = [pk for pk, _, _, _ in rows]
+            cls.objects.filter(pk__in=ids).update(status=cls.STATUS_CONFIRMED, hold_expires_at=None)
+            BookingSeat.objects.filter(booking_id__in=ids).update(
+                status=cls.STATUS_CONFIRMED,
+                hold_expires_at=None,
+            )
+            # queryset updates skip signals, so refresh occupancy and stats here
+            for bus_id, date in {(bus_id, date) for _, bus_id, date, _ in rows}:
+                SeatOccupancy.rebuild(bus_id, date)
+            for user_id in {user_id for _, _, _, user_id in rows}:
+                BookingStats.refresh(user_id)
+        return ids
+
     def clean(self):
         """
         Validate seat conflicts: when booking is confirmed (or about to be),
@@ -155,35 +618,398 @@ class Booking(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Override save to ensure seat-conflict validation:
-         - If this booking's status is 'confirmed' (or default is confirmed),
-           check each seat is free for the journey_date (excluding this booking itself).
+        Keep the denormalized bus/journey_date/status/segments on this booking's
+        seat rows in step with the booking. An active booking's seats are first
+        checked against other bookings' overlapping segments under the
+        journey's occupancy lock; a conflict raises ValidationError and the
+        whole save is rolled back.
         """
-        is_new = self.pk is None
-        # Save first if new to get pk (we still need seats attached to validate;
-        # we'll perform validation after super() if seats attached).
-        super().save(*args, **kwargs)
+        if self.to_stop is None:
+            self.to_stop = self.bus.last_stop
+        with transaction.atomic():
+            # Existing seat rows are updated first so post_save listeners
+            # (occupancy rebuild) already see the new status.
+            if self.pk is not None:
+                if self.status in BookingSeat.ACTIVE_STATUSES:
+                    self._check_seat_conflicts(self.seat_links.values('seat_id'))
+                self._sync_seat_links()
+            super().save(*args, **kwargs)
+
+    def _sync_seat_links(self):
+        self.seat_links.update(
+            bus_id=self.bus_id,
+            journey_date=self.journey_date,
+            status=self.status,
+            hold_expires_at=self.hold_expires_at,
+            segments=self.segments,
+        )
+
+    def assign_seats(self, seats):
+        """
+        Attach seats to this booking in one insert, after checking that no
+        other booking holds any of them on an overlapping segment.
+        """
+        with transaction.atomic():
+            if self.status in BookingSeat.ACTIVE_STATUSES:
+                self._check_seat_conflicts([getattr(seat, 'pk', seat) for seat in seats])
+            self.seats.set(seats, through_defaults={
+                'bus_id': self.bus_id,
+                'journey_date': self.journey_date,
+                'status': self.status,
+                'hold_expires_at': self.hold_expires_at,
+                'segments': self.segments,
+            })
+
+    def _check_seat_conflicts(self, seat_ids):
+        """
+        Raise ValidationError if another booking holds any of these seats (ids
+        or a subquery of ids) on this journey on an overlapping segment.
+        Takes the journey's occupancy lock first, so concurrent writers are
+        checked one after another; the overlap test is one query over the
+        seat rows and a bitwise AND per row. Holds that ran out but weren't
+        released yet still count.
+        """
+        SeatOccupancy.lock([(self.bus_id, self.journey_date)])
+        rows = (
+            BookingSeat.objects.filter(
+                seat_id__in=seat_ids,
+                journey_date=self.journey_date,
+                status__in=BookingSeat.ACTIVE_STATUSES,
+            )
+            .exclude(booking_id=self.pk)
+            .values_list('seat__seat_number', 'segments')
+        )
+        segments = self.segments
+        conflicting = sorted({seat_number for seat_number, taken in rows if taken & segments})
+        if conflicting:
+            raise ValidationError({
+                "seats": f"Seats already booked for {self.journey_date}: {', '.join(conflicting)}"
+            })
+
+
+class BookingSeat(models.Model):
+    """
+    Through row for Booking.seats. Carries a copy of the booking's bus,
+    journey_date, status, hold expiry and segment mask, so occupancy and
+    seat conflicts are computed from these rows alone.
+    """
+    ACTIVE_STATUSES = (Booking.STATUS_CONFIRMED, Booking.STATUS_PENDING)
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='seat_links')
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name='booking_links')
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='booking_seats')
+    journey_date = models.DateField()
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES, default=Booking.STATUS_CONFIRMED)
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+    # route segments the seat is taken for (see segment_mask); one seat can be
+    # sold several times per date as long as the masks don't overlap
+    segments = models.PositiveBigIntegerField(default=1)
 
-        # Validate seat conflicts only when status is confirmed
-        if self.status == self.STATUS_CONFIRMED:
-            # gather seats (ManyToMany may have been set previously)
-            seats_qs = self.seats.all()
-            conflicting = []
-            for seat in seats_qs:
-                conflict_exists = Booking.objects.filter(
-                    seats=seat,
-                    bus=self.bus,
-                    journey_date=self.journey_date,
-                    status=self.STATUS_CONFIRMED
-                ).exclude(pk=self.pk).exists()
-                if conflict_exists:
-                    conflicting.append(seat.seat_number)
-
-            if conflicting:
-                # Rollback: remove this booking or raise validation error.
-                # We'll raise ValidationError so caller can catch and handle.
-                raise ValidationError({
-                    "seats": f"Seats already booked for {self.journey_date}: {', '.join(conflicting)}"
-                })
-
-        # No return (saved)
+    class Meta:
+        db_table = 'bookings_booking_seats'
+        unique_together = ['booking', 'seat']
+        indexes = [
+            models.Index(fields=['bus', 'journey_date', 'status'], name='bookingseat_bus_date_idx'),
+            # seat conflict checks (Booking._check_seat_conflicts)
+            models.Index(fields=['seat', 'journey_date'], name='bookingseat_seat_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.booking_id} - {self.seat_id} on {self.journey_date} ({self.status})"
+
+    @classmethod
+    def occupying(cls, now=None):
+        """
+        Q for seat rows that make a seat unavailable right now:
+        confirmed, or pending with a hold that hasn't expired.
+        """
+        now = now or timezone.now()
+        return models.Q(status=Booking.STATUS_CONFIRMED) | (
+            models.Q(status=Booking.STATUS_PENDING)
+            & (models.Q(hold_expires_at__isnull=True) | models.Q(hold_expires_at__gt=now))
+        )
+
+
+class SeatOccupancy(models.Model):
+    """
+    Materialized seat state for one bus on one journey date.
+
+    Holds the route segments of every seat taken by confirmed bookings (one
+    bitmask per seat, see segment_mask), plus each pending booking's held
+    segments with their hold expiry, so that availability for a whole bus, or
+    any stretch of its route, is a single indexed read and a bitwise AND per seat.
+    Rows are rebuilt from booking writes (see signals.py) and created lazily
+    the first time a (bus, journey_date) pair is looked up.
+    """
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='occupancies')
+    journey_date = models.DateField()
+    # {seat_id: OR of the confirmed segment masks}
+    booked_segments = models.JSONField(default=dict, blank=True)
+    # {seat_id: [[segment mask, hold expiry as ISO timestamp or None for an open-ended hold], ...]}
+    held_segments = models.JSONField(default=dict, blank=True)
+    # bumped on every rebuild; seat-map ETags are derived from it
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['bus', 'journey_date']
+
+    def __str__(self):
+        return f"{self.bus_id} on {self.journey_date}: {len(self.booked_segments)} booked"
+
+    def seat_map_etag(self, bus_updated_at, now=None):
+        """
+        ETag for this journey's seat map: changes with any booking write (version),
+        any bus/layout edit (bus_updated_at) and any hold running out (taken count).
+        """
+        taken = len(self.taken_set(now))
+        return f'W/"{self.bus_id}-{self.journey_date}-{self.version}-{taken}-{bus_updated_at.timestamp()}"'
+
+    def seat_view(self, now=None):
+        """
+        {seat_id: (state, taken segments)}: what seat-map clients see of each taken seat.
+        """
+        segments = self.taken_segments(now)
+        return {seat_id: (state, segments.get(seat_id)) for seat_id, state in self.seat_states(now).items()}
+
+    def taken_segments(self, now=None):
+        """
+        {seat_id: mask of the segments it can't be booked on right now}:
+        confirmed plus unexpired holds. Expired holds are ignored here even
+        before the sweeper releases them. Free seats are omitted.
+        """
+        now = now or timezone.now()
+        taken = {int(seat_id): mask for seat_id, mask in self.booked_segments.items()}
+        for seat_id, holds in self.held_segments.items():
+            for mask, expires_at in holds:
+                if expires_at is None or datetime.fromisoformat(expires_at) > now:
+                    taken[int(seat_id)] = taken.get(int(seat_id), 0) | mask
+        return taken
+
+    def taken_set(self, now=None, segments=None):
+        """
+        Seat ids that can't be booked right now on any of `segments` (a
+        segment mask), or on any part of the route when segments is None.
+        """
+        return {
+            seat_id for seat_id, mask in self.taken_segments(now).items()
+            if segments is None or mask & segments
+        }
+
+    def has_expired_holds(self, now=None):
+        """
+        True if a hold on this journey has run out but its booking wasn't released yet.
+        """
+        now = now or timezone.now()
+        return any(
+            expires_at is not None and datetime.fromisoformat(expires_at) <= now
+            for holds in self.held_segments.values()
+            for _, expires_at in holds
+        )
+
+    def seat_states(self, now=None):
+        """
+        {seat_id: 'booked' | 'held'} for every seat taken on any part of the
+        route; 'booked' when any of its segments is confirmed. Free seats are omitted.
+        """
+        states = {seat_id: 'held' for seat_id in self.taken_segments(now)}
+        states.update((int(seat_id), 'booked') for seat_id in self.booked_segments)
+        return states
+
+    @staticmethod
+    def _split_seat_rows(rows):
+        """
+        (seat_id, status, hold_expires_at, segments) rows -> (booked segments,
+        held segments) as stored on the row.
+        """
+        booked, held = {}, {}
+        for seat_id, status, expires_at, segments in rows:
+            if status == Booking.STATUS_CONFIRMED:
+                booked[str(seat_id)] = booked.get(str(seat_id), 0) | segments
+            else:
+                held.setdefault(str(seat_id), []).append([segments, expires_at.isoformat() if expires_at else None])
+        return booked, held
+
+    @classmethod
+    def rebuild(cls, bus, journey_date):
+        """
+        Recompute the row for (bus, journey_date) from confirmed and held
+        bookings and store it. `bus` may be a Bus instance or its primary key.
+        """
+        bus_id = getattr(bus, 'pk', bus)
+        booked, held = cls._split_seat_rows(
+            BookingSeat.objects.filter(
+                bus_id=bus_id,
+                journey_date=journey_date,
+                status__in=BookingSeat.ACTIVE_STATUSES,
+            ).values_list('seat_id', 'status', 'hold_expires_at', 'segments')
+        )
+        previous = cls.objects.filter(bus_id=bus_id, journey_date=journey_date).first()
+        occupancy, created = cls.objects.update_or_create(
+            bus_id=bus_id,
+            journey_date=journey_date,
+            defaults={'booked_segments': booked, 'held_segments': held, 'version': models.F('version') + 1},
+            create_defaults={'booked_segments': booked, 'held_segments': held, 'version': 1},
+        )
+        if not created:
+            occupancy.refresh_from_db(fields=['version'])
+        # every booking write ends up here: invalidate cached searches for this date
+        caching.bump_search_version(journey_date)
+        before = previous.seat_view() if previous else {}
+        after = occupancy.seat_view()
+        changed = {seat_id for seat_id in before.keys() | after.keys() if before.get(seat_id) != after.get(seat_id)}
+        if changed:
+            events.publish_seat_change(occupancy, changed)
+        return occupancy
+
+    @classmethod
+    def for_journey(cls, bus, journey_date):
+        """
+        Return the occupancy row for (bus, journey_date), building it on first access.
+        """
+        bus_id = getattr(bus, 'pk', bus)
+        occupancy = cls.objects.filter(bus_id=bus_id, journey_date=journey_date).first()
+        if occupancy is None:
+            occupancy = cls.rebuild(bus_id, journey_date)
+        return occupancy
+
+    @classmethod
+    async def afor_journey(cls, bus, journey_date):
+        """
+        for_journey() for async views; only a missing row goes through the sync rebuild.
+        """
+        bus_id = getattr(bus, 'pk', bus)
+        occupancy = await cls.objects.filter(bus_id=bus_id, journey_date=journey_date).afirst()
+        if occupancy is None:
+            occupancy = await sync_to_async(cls.rebuild)(bus_id, journey_date)
+        return occupancy
+
+    @classmethod
+    def lock(cls, journeys):
+        """
+        Lock the occupancy rows for an iterable of (bus, journey_date) pairs with
+        SELECT ... FOR UPDATE and return them, freshly read, in lock order.
+
+        Rows are always locked sorted by (bus_id, journey_date) so concurrent
+        bookings touching several journeys can't deadlock each other.
+        Must be called inside transaction.atomic(); the locks are held until it commits.
+        """
+        keys = sorted({(getattr(bus, 'pk', bus), str(journey_date)) for bus, journey_date in journeys})
+        if not keys:
+            return []
+        for bus_id, journey_date in keys:
+            cls.for_journey(bus_id, journey_date)
+
+        match = models.Q()
+        for bus_id, journey_date in keys:
+            match |= models.Q(bus_id=bus_id, journey_date=journey_date)
+        return list(cls.objects.select_for_update().filter(match).order_by('bus_id', 'journey_date'))
+
+    @classmethod
+    def for_journeys(cls, buses, journey_date):
+        """
+        Bulk variant of for_journey: {bus_id: occupancy row} for many buses on one date.
+        Existing rows are read in one query; buses without a row are resolved
+        from bookings in one more query and materialized with a single bulk insert.
+        """
+        bus_ids = [getattr(bus, 'pk', bus) for bus in buses]
+        if not bus_ids:
+            return {}
+
+        occupancies = {
+            occupancy.bus_id: occupancy
+            for occupancy in cls.objects.filter(bus_id__in=bus_ids, journey_date=journey_date)
+        }
+
+        missing = [bus_id for bus_id in bus_ids if bus_id not in occupancies]
+        if missing:
+            rows = {bus_id: [] for bus_id in missing}
+            for bus_id, *row in BookingSeat.objects.filter(
+                bus_id__in=missing,
+                journey_date=journey_date,
+                status__in=BookingSeat.ACTIVE_STATUSES,
+            ).values_list('bus_id', 'seat_id', 'status', 'hold_expires_at', 'segments'):
+                rows[bus_id].append(row)
+            created = []
+            for bus_id, seat_rows in rows.items():
+                booked, held = cls._split_seat_rows(seat_rows)
+                created.append(cls(bus_id=bus_id, journey_date=journey_date, booked_segments=booked, held_segments=held))
+            cls.objects.bulk_create(created, ignore_conflicts=True)
+            occupancies.update({occupancy.bus_id: occupancy for occupancy in created})
+        return occupancies
+
+    @classmethod
+    def booked_seats_by_bus(cls, buses, journey_date, segments=None):
+        """
+        {bus_id: taken seat ids} for many buses on one date (see for_journeys),
+        optionally for a segment mask only.
+        """
+        now = timezone.now()
+        return {
+            bus_id: occupancy.taken_set(now, segments)
+            for bus_id, occupancy in cls.for_journeys(buses, journey_date).items()
+        }
+
+    @classmethod
+    async def abooked_seats_by_bus(cls, buses, journey_date, segments=None):
+        """
+        booked_seats_by_bus() for async views: existing rows are read with the
+        async ORM, buses without a row are materialized by the sync path.
+        """
+        bus_ids = [getattr(bus, 'pk', bus) for bus in buses]
+        now = timezone.now()
+        taken = {
+            occupancy.bus_id: occupancy.taken_set(now, segments)
+            async for occupancy in cls.objects.filter(bus_id__in=bus_ids, journey_date=journey_date)
+        }
+        missing = [bus_id for bus_id in bus_ids if bus_id not in taken]
+        if missing:
+            taken.update(await sync_to_async(cls.booked_seats_by_bus)(missing, journey_date, segments))
+        return taken
+
+
+class BookingStats(models.Model):
+    """
+    Per-user booking counters behind the stats widget, so reading them is a
+    single primary-key lookup. Refreshed on booking writes (see signals.py);
+    active/past depend on today's date, so a row from an earlier day is
+    recomputed on first read after midnight.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='booking_stats')
+    total_bookings = models.PositiveIntegerField(default=0)
+    active_bookings = models.PositiveIntegerField(default=0)
+    past_bookings = models.PositiveIntegerField(default=0)
+    cancelled_bookings = models.PositiveIntegerField(default=0)
+    as_of = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total_bookings} bookings as of {self.as_of}"
+
+    @classmethod
+    def refresh(cls, user):
+        """
+        Recompute the counters for `user` (instance or primary key) and store them.
+        """
+        user_id = getattr(user, 'pk', user)
+        today = timezone.now().date()
+        confirmed = models.Q(status=Booking.STATUS_CONFIRMED)
+        counts = Booking.objects.filter(user_id=user_id).aggregate(
+            total_bookings=models.Count('id'),
+            active_bookings=models.Count('id', filter=confirmed & models.Q(journey_date__gte=today)),
+            past_bookings=models.Count('id', filter=confirmed & models.Q(journey_date__lt=today)),
+            cancelled_bookings=models.Count('id', filter=models.Q(status=Booking.STATUS_CANCELLED)),
+        )
+        stats, _ = cls.objects.update_or_create(user_id=user_id, defaults={**counts, 'as_of': today})
+        return stats
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Cached counters for `user`, rolled over (recomputed) if they're from an earlier day.
+        """
+        user_id = getattr(user, 'pk', user)
+        stats = cls.objects.filter(user_id=user_id).first()
+        if stats is None or stats.as_of != timezone.now().date():
+            stats = cls.refresh(user_id)
+        return stats
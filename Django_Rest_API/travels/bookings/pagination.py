@@ -0,0 +1,118 @@
+# travels/bookings/pagination.py
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a fixed, unique ordering (e.g. (departure_date, id)).
+
+    The cursor carries the ordering values of the last row on the page and the
+    next page is fetched with a WHERE on those values, so every page costs the
+    same as the first one no matter how deep the client goes.
+    """
+    ordering = ('id',)
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views: the page is fetched with the async ORM.
+        """
+        return self._set_page([row async for row in self._page_queryset(queryset, request)])
+
+    def _page_queryset(self, queryset, request):
+        # one row past the page tells us whether there is a next page
+        self.request = request
+        self.model = queryset.model
+        self.limit = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+        return queryset[:self.limit + 1]
+
+    def _set_page(self, rows):
+        self.page = rows[:self.limit]
+        self.has_next = len(rows) > self.limit
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        position = [getattr(last, field.lstrip('-')) for field in self.ordering]
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(position)
+        )
+
+    def after(self, position):
+        """
+        Q for rows strictly after `position` in self.ordering:
+        (a > x) OR (a = x AND b > y) OR ...  with < for descending fields.
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(self.ordering[:index], position[:index]):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, position):
+        # full isoformat: DjangoJSONEncoder would drop microseconds and break the keyset
+        raw = json.dumps([
+            value.isoformat() if isinstance(value, (datetime.date, datetime.time)) else value
+            for value in position
+        ])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class BusCursorPagination(KeysetPagination):
+    ordering = ('departure_date', 'id')
+
+
+class BookingCursorPagination(KeysetPagination):
+    ordering = ('-booking_time', '-id')
@@ -0,0 +1,385 @@
+# travels/bookings/routing.py
+import heapq
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import Bus, SeatOccupancy, segment_mask
+
+MINUTES_PER_DAY = 24 * 60
+NEVER = float('inf')
+# re-read buses changed slightly before the last sync too, in case app server clocks disagree
+SYNC_OVERLAP = timedelta(minutes=1)
+
+# A ride on a bus between two of its stops (stop indexes from_stop and
+# to_stop) as an edge of the graph: leaves `origin` `departs` minutes after
+# midnight of the trip's service date (past 24h for stops reached after
+# midnight) on the days its schedule runs, and reaches `destination`
+# `duration` minutes later. Stops are normalized city keys, dates are ordinals.
+Departure = namedtuple('Departure', [
+    'bus_id', 'origin', 'destination', 'departs', 'duration', 'weekdays', 'starts_on', 'ends_on', 'price',
+    'from_stop', 'to_stop',
+])
+# one leg of an itinerary; `day` is its trip's service date as an offset from the searched date
+Leg = namedtuple('Leg', ['departure', 'day'])
+
+
+def runs_on(departure, ordinal):
+    if ordinal < departure.starts_on or ordinal > departure.ends_on:
+        return False
+    # date.fromordinal(1) is a Monday, bit 0 of weekdays
+    return bool(departure.weekdays >> ((ordinal - 1) % 7) & 1)
+
+
+def leg_departs(leg):
+    return leg.day * MINUTES_PER_DAY + leg.departure.departs
+
+
+def leg_arrives(leg):
+    return leg_departs(leg) + leg.departure.duration
+
+
+class ConnectionGraph:
+    """
+    In-memory timetable of every scheduled bus: stops are cities, and a bus
+    is a daily-repeating edge between every pair of stops it serves in order
+    (origin, intermediate stops, destination). Built once per worker and kept
+    current by refresh(), which only re-reads the buses changed since the last
+    sync, so a query never waits on more than a handful of rows.
+    """
+
+    def __init__(self):
+        self.departures = {}  # bus_id -> (Departure, ...)
+        self.outgoing = {}  # stop -> [Departure]
+        self.incoming = {}  # stop -> [Departure]
+        self.version = None
+        self.synced_at = None
+        self._bounds = {}
+        self._lock = threading.Lock()
+
+    # building
+
+    @staticmethod
+    def departures_for(bus):
+        """
+        The edges for a bus (with its schedule and stops loaded), none if it doesn't run.
+        """
+        schedule = getattr(bus, 'schedule', None)
+        if schedule is None or not bus.is_active:
+            return []
+        start = bus.start_time.hour * 60 + bus.start_time.minute
+        duration = bus.reach_time.hour * 60 + bus.reach_time.minute - start
+        if duration <= 0:
+            duration += MINUTES_PER_DAY  # overnight
+        stops = list(bus.stops.all())
+        keys = [bus.origin_key] + [stop.city_key for stop in stops] + [bus.destination_key]
+        offsets = [0] + [stop.minutes_from_start for stop in stops] + [duration]
+        ends_on = schedule.ends_on.toordinal() if schedule.ends_on else NEVER
+        return [
+            Departure(
+                bus.id, keys[i], keys[j], start + offsets[i], offsets[j] - offsets[i], schedule.weekdays,
+                schedule.starts_on.toordinal(), ends_on, bus.price, i, j,
+            )
+            for i in range(len(keys)) for j in range(i + 1, len(keys))
+            if offsets[j] > offsets[i]
+        ]
+
+    def load(self, buses):
+        self.update({bus.id: self.departures_for(bus) for bus in buses})
+
+    def update(self, changed):
+        """
+        Apply {bus_id: [Departure, ...], empty to drop the bus}, rewriting each
+        touched stop list once. Lists are replaced, never mutated, so searches
+        running in other threads keep iterating over a consistent snapshot.
+        """
+        changed = {bus_id: departures for bus_id, departures in changed.items() if departures or bus_id in self.departures}
+        if not changed:
+            return
+        for index, end in ((self.outgoing, 'origin'), (self.incoming, 'destination')):
+            added = {getattr(d, end): [] for bus_id in changed for d in self.departures.get(bus_id, ())}
+            for departures in changed.values():
+                for departure in departures:
+                    added.setdefault(getattr(departure, end), []).append(departure)
+            for stop, departures in added.items():
+                index[stop] = [d for d in index.get(stop, ()) if d.bus_id not in changed] + departures
+        for bus_id, departures in changed.items():
+            if departures:
+                self.departures[bus_id] = tuple(departures)
+            else:
+                del self.departures[bus_id]
+        self._bounds = {}
+
+    def refresh(self):
+        """
+        Catch up with the fleet: a no-op while the fleet version is unchanged,
+        otherwise re-read just the buses edited since the last sync and drop
+        the deleted ones.
+        """
+        version = Bus.objects.fleet_version()
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            started = timezone.now()
+            buses = Bus.objects.select_related('schedule').prefetch_related('stops').only(
+                'id', 'origin', 'destination', 'origin_key', 'destination_key', 'start_time', 'reach_time',
+                'price', 'is_active', 'schedule__weekdays', 'schedule__starts_on', 'schedule__ends_on',
+            )
+            if self.synced_at is not None:
+                buses = buses.filter(updated_at__gte=self.synced_at - SYNC_OVERLAP)
+                deleted = set(self.departures) - set(Bus.objects.values_list('id', flat=True))
+                self.update({bus_id: [] for bus_id in deleted})
+            self.load(buses)
+            self.version, self.synced_at = version, started
+
+    # searching
+
+    def lower_bounds(self, destination, min_transfer):
+        """
+        For every stop that can reach `destination`: (fewest minutes, fewest
+        legs) to get there, ignoring waits and which days buses run. Used to
+        prune the time-dependent search; cached until the graph changes.
+        """
+        key = (destination, min_transfer)
+        bounds = self._bounds.get(key)
+        if bounds is not None:
+            return bounds
+        minutes, legs = {destination: 0}, {destination: 0}
+        heap = [(0, destination)]
+        while heap:
+            cost, stop = heapq.heappop(heap)
+            if cost > minutes[stop]:
+                continue
+            # every leg except the last is followed by a transfer
+            transfer = min_transfer if stop != destination else 0
+            for departure in self.incoming.get(stop, ()):
+                candidate = cost + departure.duration + transfer
+                if candidate < minutes.get(departure.origin, NEVER):
+                    minutes[departure.origin] = candidate
+                    heapq.heappush(heap, (candidate, departure.origin))
+        frontier = [destination]
+        while frontier:
+            reached = []
+            for stop in frontier:
+                for departure in self.incoming.get(stop, ()):
+                    if departure.origin not in legs:
+                        legs[departure.origin] = legs[stop] + 1
+                        reached.append(departure.origin)
+            frontier = reached
+        bounds = {stop: (minutes[stop], legs[stop]) for stop in minutes}
+        if len(self._bounds) > 1024:
+            self._bounds = {}
+        self._bounds[key] = bounds
+        return bounds
+
+    def plan(self, origin, destination, service_date, after=0, min_transfer=30, max_wait=12 * 60,
+             max_legs=3, limit=5, exclude=()):
+        """
+        Itineraries from origin to destination leaving on service_date at or
+        after `after` (minutes after midnight), as lists of Legs.
+
+        Returns the Pareto-optimal ones, earliest departure first: none of
+        them is beaten by another that leaves later, arrives no later and
+        changes buses no more often. Connections need at least min_transfer
+        and at most max_wait minutes between legs. Legs in `exclude` are
+        never used.
+        """
+        bounds = self.lower_bounds(destination, min_transfer)
+        day0 = service_date.toordinal()
+        firsts = []
+        for departure in self.outgoing.get(origin, ()):
+            # the trip that passes this stop on the searched date (it may have started the day before)
+            day, minute = divmod(departure.departs, MINUTES_PER_DAY)
+            leg = Leg(departure, -day)
+            if (
+                minute >= after and departure.destination in bounds and bounds[departure.destination][1] < max_legs
+                and runs_on(departure, day0 - day) and leg not in exclude
+            ):
+                firsts.append(leg)
+        # Latest first departure first: an earlier one is only worth keeping
+        # if it arrives strictly earlier than everything found so far on as
+        # few legs, and those bounds prune each search harder than the last.
+        firsts.sort(key=leg_departs, reverse=True)
+        best = [NEVER] * (max_legs + 1)  # earliest arrival found using at most n legs
+        found = []
+        for leg in firsts:
+            first = leg.departure
+            for cap in range(1 + bounds[first.destination][1], max_legs + 1):
+                if leg_arrives(leg) + bounds[first.destination][0] >= best[cap]:
+                    continue
+                legs = self._earliest_arrival(
+                    leg, destination, day0, bounds, best[cap], min_transfer, max_wait, cap, exclude
+                )
+                if legs:
+                    arrival = leg_arrives(legs[-1])
+                    for n in range(len(legs), max_legs + 1):
+                        best[n] = min(best[n], arrival)
+                    found.append(legs)
+        found.sort(key=lambda legs: (leg_departs(legs[0]), leg_arrives(legs[-1])))
+        return found[:limit]
+
+    def _earliest_arrival(self, first, destination, day0, bounds, bound, min_transfer, max_wait,
+                          max_legs, exclude):
+        """
+        Time-dependent A* from the end of `first`: the earliest way to reach
+        destination before `bound`, or None. States are (stop, legs used) so
+        a slower path with fewer legs isn't discarded while legs are capped.
+        """
+        start = (first.departure.destination, 1)
+        labels = {(first.departure.origin, 0): leg_departs(first), start: leg_arrives(first)}
+        parents = {start: (first, None)}
+        heap = [(leg_arrives(first) + bounds[start[0]][0], leg_arrives(first), start)]
+        while heap:
+            estimate, arrived, state = heapq.heappop(heap)
+            if estimate >= bound:
+                return None
+            if arrived > labels[state]:
+                continue
+            stop, used = state
+            if stop == destination:
+                legs = []
+                while state is not None:
+                    leg, state = parents[state]
+                    legs.append(leg)
+                return legs[::-1]
+            if used >= max_legs:
+                continue
+            ready = arrived + min_transfer
+            for departure in self.outgoing.get(stop, ()):
+                remaining = bounds.get(departure.destination)
+                if remaining is None or used + 1 + remaining[1] > max_legs:
+                    continue
+                day = self._next_day(departure, ready, day0, max_wait)
+                if day is None:
+                    continue
+                leg = Leg(departure, day)
+                if leg in exclude:
+                    continue
+                arrival = leg_arrives(leg)
+                if arrival + remaining[0] >= bound:
+                    continue
+                target = (departure.destination, used + 1)
+                # dominated by an earlier arrival there on as few legs
+                if any(labels.get((departure.destination, n), NEVER) <= arrival for n in range(used + 2)):
+                    continue
+                labels[target] = arrival
+                parents[target] = (leg, state)
+                heapq.heappush(heap, (arrival + remaining[0], arrival, target))
+        return None
+
+    @staticmethod
+    def _next_day(departure, ready, day0, max_wait):
+        """
+        Service date offset of the first trip that makes this departure at or
+        after minute `ready`, if that is within max_wait minutes.
+        """
+        day = -((departure.departs - ready) // MINUTES_PER_DAY)
+        while day * MINUTES_PER_DAY + departure.departs - ready <= max_wait:
+            if runs_on(departure, day0 + day):
+                return day
+            day += 1
+        return None
+
+    def leg_times(self, leg, service_date):
+        """
+        Aware (departs_at, arrives_at) for a leg of a search on service_date.
+        """
+        midnight = datetime.combine(service_date, datetime.min.time())
+        return (
+            timezone.make_aware(midnight + timedelta(minutes=leg_departs(leg))),
+            timezone.make_aware(midnight + timedelta(minutes=leg_arrives(leg))),
+        )
+
+
+_graph = ConnectionGraph()
+
+
+def get_graph():
+    """
+    This worker's connection graph, caught up with the fleet.
+    """
+    _graph.refresh()
+    return _graph
+
+
+def find_itineraries(origin, destination, service_date, after=0, min_transfer=30, max_wait=12 * 60,
+                     max_legs=3, limit=5):
+    """
+    Bookable itineraries between two cities (matched on their normalized
+    keys), as plain dicts ready to render. Legs that are already full on
+    their date are excluded and the plan rerun, a couple of times at most.
+    """
+    graph = get_graph()
+    exclude = set()
+    for _ in range(3):
+        plans = graph.plan(
+            origin, destination, service_date, after=after, min_transfer=min_transfer,
+            max_wait=max_wait, max_legs=max_legs, limit=limit, exclude=exclude,
+        )
+        buses = Bus.objects.prefetch_related('stops').only(
+            'id', 'bus_name', 'number', 'origin', 'destination', 'no_of_seats'
+        ).in_bulk({leg.departure.bus_id for legs in plans for leg in legs})
+        seats = _seats_available(plans, service_date, buses)
+        full = {leg for legs in plans for leg in legs if seats[leg] <= 0}
+        if not full:
+            break
+        exclude |= full
+    plans = [legs for legs in plans if all(seats[leg] > 0 for leg in legs)]
+
+    itineraries = []
+    for legs in plans:
+        rendered = []
+        for leg in legs:
+            bus = buses[leg.departure.bus_id]
+            stops = bus.route_stops()
+            departs_at, arrives_at = graph.leg_times(leg, service_date)
+            rendered.append({
+                'bus': bus.id,
+                'bus_name': bus.bus_name,
+                'number': bus.number,
+                'origin': stops[leg.departure.from_stop],
+                'destination': stops[leg.departure.to_stop],
+                'from_stop': leg.departure.from_stop,
+                'to_stop': leg.departure.to_stop,
+                'journey_date': service_date + timedelta(days=leg.day),
+                'departs_at': departs_at,
+                'arrives_at': arrives_at,
+                'price': leg.departure.price,
+                'seats_available': seats[leg],
+            })
+        itineraries.append({
+            'departs_at': rendered[0]['departs_at'],
+            'arrives_at': rendered[-1]['arrives_at'],
+            'duration_minutes': leg_arrives(legs[-1]) - leg_departs(legs[0]),
+            'transfers': len(legs) - 1,
+            'price': sum(leg.departure.price for leg in legs),
+            'legs': rendered,
+        })
+    return itineraries
+
+
+def _seats_available(plans, service_date, buses):
+    """
+    Free seats on every leg's stretch of its trip: one occupancy read per
+    trip date, then a bitwise check per seat.
+    """
+    by_day = {}
+    for legs in plans:
+        for leg in legs:
+            by_day.setdefault(leg.day, []).append(leg)
+    now = timezone.now()
+    seats = {}
+    for day, legs in by_day.items():
+        occupancies = SeatOccupancy.for_journeys(
+            {leg.departure.bus_id for leg in legs}, service_date + timedelta(days=day)
+        )
+        for leg in legs:
+            taken = occupancies[leg.departure.bus_id].taken_set(
+                now, segment_mask(leg.departure.from_stop, leg.departure.to_stop)
+            )
+            seats[leg] = max(buses[leg.departure.bus_id].no_of_seats - len(taken), 0)
+    return seats
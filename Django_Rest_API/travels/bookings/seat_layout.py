@@ -0,0 +1,146 @@
+# travels/bookings/seat_layout.py
+import logging
+import string
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Bus, Seat, BookingSeat
+
+logger = logging.getLogger(__name__)
+
+SEQUENTIAL_PREFIX = {
+    Bus.SEATER: 'S',
+    Bus.SLEEPER: 'B',
+}
+
+
+def seat_place(bus, position):
+    """
+    Layout attributes (seat_number, row, column) for the seat at a 1-based position.
+    """
+    per_row = max(bus.seats_per_row, 1)
+    row, column = divmod(position - 1, per_row)
+    row, column = row + 1, column + 1
+    if bus.seat_numbering == Bus.NUMBERING_ROW_LETTER:
+        seat_number = f"{row}{string.ascii_uppercase[(column - 1) % 26]}"
+    else:
+        seat_number = f"{SEQUENTIAL_PREFIX.get(bus.seat_type, 'S')}{position}"
+    return {'seat_number': seat_number, 'row': row, 'column': column}
+
+
+def build_seats(bus, positions):
+    """
+    Unsaved Seat objects for the given positions, ready for bulk_create.
+    """
+    return [Seat(bus=bus, position=position, **seat_place(bus, position)) for position in positions]
+
+
+def sync_seats(bus):
+    """
+    Make the bus's seats match no_of_seats and its layout settings:
+     - missing positions are created with one bulk insert
+     - surplus seats are deleted, except ones that still carry upcoming bookings
+       (those stay out of service, see Bus.bookable_seats)
+     - seats whose number/row/column no longer match the layout are updated in bulk
+    """
+    with transaction.atomic():
+        existing = list(Seat.objects.filter(bus=bus).order_by('position'))
+        positions = {seat.position for seat in existing}
+
+        missing = [position for position in range(1, bus.no_of_seats + 1) if position not in positions]
+        surplus = [seat.pk for seat in existing if seat.position > bus.no_of_seats]
+        moved = []
+        for seat in existing:
+            if seat.position > bus.no_of_seats:
+                continue
+            place = seat_place(bus, seat.position)
+            if any(getattr(seat, field) != value for field, value in place.items()):
+                for field, value in place.items():
+                    setattr(seat, field, value)
+                moved.append(seat)
+
+        if surplus:
+            # past and cancelled bookings don't need their seat any more
+            booked = set(
+                BookingSeat.objects.filter(
+                    seat_id__in=surplus,
+                    status__in=BookingSeat.ACTIVE_STATUSES,
+                    journey_date__gte=timezone.now().date(),
+                ).values_list('seat_id', flat=True).distinct()
+            )
+            if booked:
+                logger.warning("Keeping %d booked seat(s) beyond capacity on bus %s", len(booked), bus.pk)
+            Seat.objects.filter(pk__in=[pk for pk in surplus if pk not in booked]).delete()
+
+        if moved:
+            # renumber through temporary names so swapped numbers can't collide mid-update
+            final_numbers = [seat.seat_number for seat in moved]
+            for seat in moved:
+                seat.seat_number = f"~{seat.pk}"
+            Seat.objects.bulk_update(moved, ['seat_number'])
+            for seat, seat_number in zip(moved, final_numbers):
+                seat.seat_number = seat_number
+            Seat.objects.bulk_update(moved, ['seat_number', 'row', 'column'])
+
+        if missing:
+            Seat.objects.bulk_create(build_seats(bus, missing))
+
+
+def highest_booked_position(bus):
+    """
+    Highest seat position holding a current (confirmed or held) booking from today on.
+    """
+    return max(
+        BookingSeat.objects.filter(
+            bus=bus,
+            status__in=BookingSeat.ACTIVE_STATUSES,
+            journey_date__gte=timezone.now().date(),
+        ).values_list('seat__position', flat=True),
+        default=0,
+    )
+
+
+def find_adjacent_seats(seats, taken, count):
+    """
+    Pick `count` free seats that sit together, or None if the layout has no
+    such block left. `seats` are the bus's seats, `taken` the ids that can't
+    be booked.
+
+    One pass over the seats in position order collects every run of free
+    seats. A run that stays in one row, with consecutive columns, is
+    preferred. When no row has room, the fallback is a run of consecutive
+    positions that wraps onto the next row. Either way the smallest run
+    that fits wins, so large blocks are kept for large groups.
+    """
+    row_run, position_run = [], []
+    best_row, best_position = None, None
+
+    def better(run, best):
+        return len(run) >= count and (best is None or len(run) < len(best))
+
+    for seat in sorted(seats, key=lambda seat: seat.position):
+        if seat.pk in taken:
+            if better(row_run, best_row):
+                best_row = row_run
+            if better(position_run, best_position):
+                best_position = position_run
+            row_run, position_run = [], []
+            continue
+        if position_run and seat.position != position_run[-1].position + 1:
+            if better(position_run, best_position):
+                best_position = position_run
+            position_run = []
+        if row_run and (seat.row != row_run[-1].row or seat.column != row_run[-1].column + 1):
+            if better(row_run, best_row):
+                best_row = row_run
+            row_run = []
+        row_run.append(seat)
+        position_run.append(seat)
+
+    if better(row_run, best_row):
+        best_row = row_run
+    if better(position_run, best_position):
+        best_position = position_run
+    best = best_row or best_position
+    return best[:count] if best else None
@@ -1,38 +1,82 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework import serializers
-from ..models import Bus, Seat, Booking  # relative import of models
+from ..models import (  # relative import of models
+    Bus, Seat, Booking, BookingSeat, BookingStats, SeatOccupancy, Trip, segment_mask
+)
+from ..seat_layout import find_adjacent_seats
 from .bus_serializers import BusSerializer, SeatSerializer  # relative import within same folder
 
 
 class BookingCreateSerializer(serializers.ModelSerializer):
     journey_date = serializers.DateField(required=True)
     seats = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Seat.objects.all(), write_only=True
+        many=True, queryset=Seat.objects.all(), write_only=True, required=False
     )
+    # instead of seats: let the server pick this many free seats next to each other
+    seat_count = serializers.IntegerField(required=False, min_value=1, write_only=True)
+    # hold=true reserves the seats as a pending booking until payment confirms it
+    hold = serializers.BooleanField(required=False, default=False, write_only=True)
+    # stop indexes to travel between (bus `stops`); the whole route by default
+    from_stop = serializers.IntegerField(required=False, min_value=0)
+    to_stop = serializers.IntegerField(required=False, min_value=1)
 
     class Meta:
         model = Booking
-        fields = ['bus', 'seats', 'journey_date']
+        fields = ['bus', 'seats', 'seat_count', 'journey_date', 'hold', 'from_stop', 'to_stop']
 
     def validate(self, data):
         bus = data['bus']
-        seats = data['seats']
+        seat_count = data.pop('seat_count', None)
+        if ('seats' in data) == (seat_count is not None):
+            raise serializers.ValidationError("Pass either seats or seat_count")
+
+        trip = Trip.for_journey(bus, data['journey_date'])
+        if trip is None or trip.status != Trip.STATUS_SCHEDULED:
+            raise serializers.ValidationError(f"This bus does not run on {data['journey_date']}")
+
+        data.setdefault('from_stop', 0)
+        data.setdefault('to_stop', bus.last_stop)
+        if not data['from_stop'] < data['to_stop'] <= bus.last_stop:
+            raise serializers.ValidationError(
+                f"from_stop and to_stop must be stops 0-{bus.last_stop} of this route, from_stop first"
+            )
+        segments = segment_mask(data['from_stop'], data['to_stop'])
+
+        # Lock this journey's occupancy row until the booking commits so two
+        # concurrent requests can't both pass the check below. Callers must run
+        # is_valid() and save() inside the same transaction (BookingView does).
+        occupancy = SeatOccupancy.lock([(bus, data['journey_date'])])[0]
+        # holds that ran out on this journey still own their seat rows; free them first
+        if Booking.release_expired_holds(bus=bus, journey_date=data['journey_date']):
+            occupancy.refresh_from_db()
+        # seats taken on any overlapping segment: one bitwise AND per seat
+        booked_seat_ids = occupancy.taken_set(segments=segments)
+
+        if seat_count is not None:
+            # picked while the occupancy lock is held, so no other request can take them first
+            data['seats'] = find_adjacent_seats(bus.bookable_seats(), booked_seat_ids, seat_count)
+            if data['seats'] is None:
+                raise serializers.ValidationError(
+                    f"No {seat_count} seats together are left on this bus for {data['journey_date']}"
+                )
+            return data
 
+        seats = data['seats']
         # check all seats belong to the same bus
         for seat in seats:
-            if seat.bus != bus:
+            if seat.bus_id != bus.id:
                 raise serializers.ValidationError(
                     f"Seat {seat.seat_number} does not belong to the selected bus"
                 )
+            # kept past no_of_seats only for the bookings it already has
+            if seat.position > bus.no_of_seats:
+                raise serializers.ValidationError(f"Seat {seat.seat_number} is not in service")
 
             # check if already booked
-            if Booking.objects.filter(
-                seats=seat,
-                bus=bus,
-                journey_date=data['journey_date'],
-                status='confirmed'
-            ).exists():
+            if seat.id in booked_seat_ids:
                 raise serializers.ValidationError(
                     f"Seat {seat.seat_number} is already booked for this date"
                 )
@@ -42,16 +86,175 @@ class BookingCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
         seats = validated_data.pop('seats')
+        hold = validated_data.pop('hold', False)
         booking = Booking.objects.create(
             user=user,
             bus=validated_data['bus'],
             journey_date=validated_data['journey_date'],
-            status='confirmed'
+            from_stop=validated_data['from_stop'],
+            to_stop=validated_data['to_stop'],
+            status=Booking.STATUS_PENDING if hold else Booking.STATUS_CONFIRMED,
+            hold_expires_at=Booking.hold_deadline() if hold else None,
         )
-        booking.seats.set(seats)  # many-to-many seat assignment
+        # overlapping bookings of these seats are re-checked by _check_seat_conflicts under the occupancy lock
+        booking.assign_seats(seats)
         return booking
 
 
+class BookingBatchItemSerializer(serializers.Serializer):
+    """
+    One booking of a batch: same fields as BookingCreateSerializer. Ids are
+    resolved by BookingBatchSerializer for all items at once.
+    """
+    bus = serializers.IntegerField(min_value=1)
+    journey_date = serializers.DateField()
+    seats = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    seat_count = serializers.IntegerField(required=False, min_value=1)
+    from_stop = serializers.IntegerField(required=False, min_value=0)
+    to_stop = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, data):
+        if ('seats' in data) == ('seat_count' in data):
+            raise serializers.ValidationError("Pass either seats or seat_count")
+        return data
+
+
+class BookingBatchSerializer(serializers.Serializer):
+    """
+    Several bookings, possibly on different buses and dates, made all or
+    nothing. Validation locks every journey's occupancy row once, in lock
+    order, and checks all items against them and against each other in
+    memory. Errors come back per item, keyed by item index under `items`,
+    the way DRF reports nested list errors. Like BookingCreateSerializer, is_valid()
+    and save() must run in the same transaction.
+    """
+    items = BookingBatchItemSerializer(many=True, allow_empty=False, max_length=settings.BOOKING_BATCH_MAX_ITEMS)
+    hold = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        items = data['items']
+        buses = Bus.objects.prefetch_related('seats', 'stops').in_bulk({item['bus'] for item in items})
+        journeys = {(item['bus'], item['journey_date']) for item in items if item['bus'] in buses}
+
+        for service_date in {journey_date for _, journey_date in journeys}:
+            Trip.materialize(service_date)
+        running = Q(pk__in=[])
+        for bus_id, journey_date in journeys:
+            running |= Q(bus_id=bus_id, service_date=journey_date)
+        running = set(
+            Trip.objects.filter(running, status=Trip.STATUS_SCHEDULED).values_list('bus_id', 'service_date')
+        )
+
+        # lock every journey at once (sorted, so batches can't deadlock each other)
+        now = timezone.now()
+        occupancies = {(o.bus_id, o.journey_date): o for o in SeatOccupancy.lock(journeys)}
+        stale = [key for key, occupancy in occupancies.items() if occupancy.has_expired_holds(now)]
+        for bus_id, journey_date in stale:
+            Booking.release_expired_holds(bus=bus_id, journey_date=journey_date)
+        if stale:
+            occupancies.update({(o.bus_id, o.journey_date): o for o in SeatOccupancy.lock(stale)})
+        # {journey: {seat_id: taken segment mask}}, grown by each item as it claims seats
+        taken = {key: occupancy.taken_segments(now) for key, occupancy in occupancies.items()}
+
+        errors = {}
+        for index, item in enumerate(items):
+            try:
+                self._claim_seats(item, buses, running, taken)
+            except serializers.ValidationError as exc:
+                errors[index] = {'non_field_errors': exc.detail}
+        if errors:
+            raise serializers.ValidationError({'items': errors})
+        return data
+
+    @staticmethod
+    def _claim_seats(item, buses, running, taken):
+        """
+        Resolve one item's bus, stops and seats (picking them for seat_count)
+        and add its seats to `taken`, or raise ValidationError.
+        """
+        bus = buses.get(item['bus'])
+        if bus is None:
+            raise serializers.ValidationError(f"Bus {item['bus']} does not exist")
+        journey_date = item['journey_date']
+        if (bus.pk, journey_date) not in running:
+            raise serializers.ValidationError(f"This bus does not run on {journey_date}")
+
+        item['bus'] = bus
+        item.setdefault('from_stop', 0)
+        item.setdefault('to_stop', bus.last_stop)
+        if not item['from_stop'] < item['to_stop'] <= bus.last_stop:
+            raise serializers.ValidationError(
+                f"from_stop and to_stop must be stops 0-{bus.last_stop} of this route, from_stop first"
+            )
+        segments = segment_mask(item['from_stop'], item['to_stop'])
+        journey_taken = taken[(bus.pk, journey_date)]
+        unavailable = {seat_id for seat_id, mask in journey_taken.items() if mask & segments}
+
+        seat_count = item.pop('seat_count', None)
+        if seat_count is not None:
+            seats = find_adjacent_seats(bus.bookable_seats(), unavailable, seat_count)
+            if seats is None:
+                raise serializers.ValidationError(
+                    f"No {seat_count} seats together are left on this bus for {journey_date}"
+                )
+        else:
+            bus_seats = {seat.pk: seat for seat in bus.seats.all()}
+            seats = []
+            for seat_id in dict.fromkeys(item['seats']):
+                seat = bus_seats.get(seat_id)
+                if seat is None:
+                    raise serializers.ValidationError(f"Seat {seat_id} does not belong to the selected bus")
+                if seat.position > bus.no_of_seats:
+                    raise serializers.ValidationError(f"Seat {seat.seat_number} is not in service")
+                if seat_id in unavailable:
+                    raise serializers.ValidationError(f"Seat {seat.seat_number} is already booked for this date")
+                seats.append(seat)
+
+        item['seats'] = seats
+        for seat in seats:
+            journey_taken[seat.pk] = journey_taken.get(seat.pk, 0) | segments
+
+    def create(self, validated_data):
+        """
+        Insert every booking with one query and all their seat rows with
+        another, then rebuild each journey's occupancy once.
+        """
+        user = self.context['request'].user
+        hold = validated_data['hold']
+        items = validated_data['items']
+        hold_expires_at = Booking.hold_deadline() if hold else None
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                user=user,
+                bus=item['bus'],
+                journey_date=item['journey_date'],
+                from_stop=item['from_stop'],
+                to_stop=item['to_stop'],
+                status=Booking.STATUS_PENDING if hold else Booking.STATUS_CONFIRMED,
+                hold_expires_at=hold_expires_at,
+            )
+            for item in items
+        ])
+        BookingSeat.objects.bulk_create([
+            BookingSeat(
+                booking=booking,
+                seat=seat,
+                bus_id=booking.bus_id,
+                journey_date=booking.journey_date,
+                status=booking.status,
+                hold_expires_at=booking.hold_expires_at,
+                segments=booking.segments,
+            )
+            for booking, item in zip(bookings, items)
+            for seat in item['seats']
+        ])
+        # bulk inserts skip signals, so refresh occupancy and stats here
+        for bus_id, journey_date in {(booking.bus_id, booking.journey_date) for booking in bookings}:
+            SeatOccupancy.rebuild(bus_id, journey_date)
+        BookingStats.refresh(user)
+        return bookings
+
+
 class BookingSerializer(serializers.ModelSerializer):
     bus = BusSerializer(read_only=True)
     seats = SeatSerializer(read_only=True, many=True)
@@ -63,8 +266,8 @@ class BookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = [
-            'id', 'user', 'bus', 'seats', 'booking_time', 'journey_date',
-            'status', 'status_display', 'cancelled_at', 'cancellation_reason', 'can_cancel', 'price'
+            'id', 'user', 'bus', 'seats', 'booking_time', 'journey_date', 'from_stop', 'to_stop',
+            'status', 'status_display', 'hold_expires_at', 'cancelled_at', 'cancellation_reason', 'can_cancel', 'price'
         ]
 
     def get_status_display(self, obj):
@@ -77,5 +280,48 @@ class BookingSerializer(serializers.ModelSerializer):
         return obj.journey_date >= timezone.now().date()
 
     def get_price(self, obj):
-        # multiple seats support
-        return sum(seat.bus.price for seat in obj.seats.all())
+        # multiple seats support; every seat is on obj.bus, so no per-seat bus lookup
+        if hasattr(obj, 'total_price'):
+            return obj.total_price
+        return obj.bus.price * len(obj.seats.all())
+
+
+class BookingBusSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Bus
+        fields = ['id', 'bus_name', 'number', 'origin', 'destination', 'start_time', 'reach_time', 'price']
+
+
+class BookingSeatSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Seat
+        fields = ['id', 'seat_number']
+
+
+class BookingHistorySerializer(serializers.ModelSerializer):
+    """
+    Lightweight booking row for history/stats lists. Expects a queryset from
+    Booking.objects.for_history(): no nested seat maps, no per-seat lookups.
+    """
+    bus = BookingBusSummarySerializer(read_only=True)
+    seats = BookingSeatSummarySerializer(read_only=True, many=True)
+    user = serializers.StringRelatedField()
+    # where the passenger gets on and off (a booking may cover part of the route)
+    origin = serializers.CharField(read_only=True)
+    destination = serializers.CharField(read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    can_cancel = serializers.SerializerMethodField()
+    price = serializers.DecimalField(source='total_price', max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = [
+            'id', 'user', 'bus', 'seats', 'origin', 'destination', 'from_stop', 'to_stop', 'booking_time',
+            'journey_date', 'status', 'status_display', 'hold_expires_at', 'cancelled_at', 'cancellation_reason',
+            'can_cancel', 'price'
+        ]
+
+    def get_can_cancel(self, obj):
+        if obj.status != 'confirmed':
+            return False
+        return obj.journey_date >= timezone.now().date()
@@ -1,41 +1,96 @@
 # travels/bookings/serializers/bus_serializers.py
 from rest_framework import serializers
-from ..models import Bus, Seat, Booking
+from ..models import Bus, BusStop, Seat, Booking, SeatOccupancy
+from ..seat_layout import highest_booked_position
 
 class SeatSerializer(serializers.ModelSerializer):
     is_booked = serializers.SerializerMethodField()
 
     class Meta:
         model = Seat
-        fields = ['id', 'seat_number', 'is_booked']
+        fields = ['id', 'seat_number', 'row', 'column', 'is_booked']
 
     def get_is_booked(self, seat):
         journey_date = self.context.get('journey_date')
-        if journey_date:
-            return Booking.objects.filter(
-                seats=seat,        # ✅ ManyToMany corrected
-                bus=seat.bus,
-                journey_date=journey_date,
-                status='confirmed'
-            ).exists()
-        return False
+        if not journey_date:
+            return False
+        # BusSerializer passes the bus's booked seat ids so the whole seat map is one read
+        booked_seat_ids = self.context.get('booked_seat_ids')
+        if booked_seat_ids is None:
+            return not seat.is_available(journey_date)
+        return seat.id in booked_seat_ids
+
+
+class BusStopSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BusStop
+        fields = ['position', 'city', 'minutes_from_start']
+
+
+class BusListSerializer(serializers.ListSerializer):
+    """
+    Resolves booked seats for every bus in the list up front, so the
+    nested seat maps cost a constant number of queries however many buses there are.
+    """
+
+    def to_representation(self, data):
+        buses = list(data.all() if hasattr(data, 'all') else data)
+        journey_date = self.context.get('journey_date')
+        if journey_date and 'booked_seats_by_bus' not in self.context:
+            self.context['booked_seats_by_bus'] = SeatOccupancy.booked_seats_by_bus(
+                buses, journey_date, self.context.get('segments')
+            )
+        return super().to_representation(buses)
 
 
 class BusSerializer(serializers.ModelSerializer):
     seats = serializers.SerializerMethodField()
-    available_seats = serializers.IntegerField(read_only=True)
-    is_full = serializers.BooleanField(read_only=True)
+    # intermediate stops; origin is stop 0 and destination the stop after the last of these
+    stops = BusStopSerializer(many=True, read_only=True)
+    available_seats = serializers.SerializerMethodField()
+    is_full = serializers.SerializerMethodField()
 
     class Meta:
         model = Bus
         fields = [
             'id', 'bus_name', 'number', 'origin', 'destination',
             'start_time', 'reach_time', 'no_of_seats', 'price',
-            'seats', 'available_seats', 'is_full'
+            'seat_type', 'seats_per_row', 'seat_numbering',
+            'stops', 'seats', 'available_seats', 'is_full'
         ]
+        list_serializer_class = BusListSerializer
+
+    def validate_no_of_seats(self, value):
+        if self.instance is not None and value < self.instance.no_of_seats:
+            booked = highest_booked_position(self.instance)
+            if value < booked:
+                raise serializers.ValidationError(
+                    f"Seat {booked} has upcoming bookings; no_of_seats can't go below {booked}"
+                )
+        return value
 
     def get_seats(self, bus):
         journey_date = self.context.get('journey_date')
-        seats_qs = bus.seats.all()
-        serializer = SeatSerializer(seats_qs, many=True, context={'journey_date': journey_date})
+        seats = bus.bookable_seats()
+        context = {'journey_date': journey_date}
+        if journey_date:
+            booked_seats_by_bus = self.context.get('booked_seats_by_bus')
+            if booked_seats_by_bus is not None and bus.id in booked_seats_by_bus:
+                context['booked_seat_ids'] = booked_seats_by_bus[bus.id]
+            else:
+                context['booked_seat_ids'] = SeatOccupancy.for_journey(bus, journey_date).taken_set(
+                    segments=self.context.get('segments')
+                )
+        serializer = SeatSerializer(seats, many=True, context=context)
         return serializer.data
+
+    def get_available_seats(self, bus):
+        # annotated by Bus.objects.with_availability() in list views
+        if hasattr(bus, 'seats_available'):
+            return bus.seats_available
+        return bus.available_seats(self.context.get('journey_date'))
+
+    def get_is_full(self, bus):
+        if hasattr(bus, 'is_full'):
+            return bus.is_full
+        return self.get_available_seats(bus) <= 0
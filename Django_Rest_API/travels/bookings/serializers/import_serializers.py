@@ -0,0 +1,53 @@
+from rest_framework import serializers
+from ..models import Bus, BusSchedule
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+class ScheduleRowSerializer(serializers.Serializer):
+    """
+    One row of a fleet/schedule import file. A row is either a single departure
+    or, with repeat_until (and optionally days), a recurring schedule; either
+    way it imports as one Bus plus its BusSchedule.
+    """
+    bus_name = serializers.CharField(max_length=100)
+    number = serializers.CharField(max_length=20)
+    origin = serializers.CharField(max_length=50)
+    destination = serializers.CharField(max_length=50)
+    features = serializers.CharField(required=False, allow_blank=True, default='')
+    start_time = serializers.TimeField()
+    reach_time = serializers.TimeField()
+    departure_date = serializers.DateField()
+    repeat_until = serializers.DateField(required=False, allow_null=True, default=None)
+    days = serializers.CharField(required=False, allow_blank=True, default='')
+    no_of_seats = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(max_digits=8, decimal_places=2, min_value=0)
+    seat_type = serializers.ChoiceField(choices=Bus.SEAT_TYPE_CHOICES, default=Bus.SEATER)
+    seats_per_row = serializers.IntegerField(min_value=1, default=4)
+    seat_numbering = serializers.ChoiceField(choices=Bus.NUMBERING_CHOICES, default=Bus.NUMBERING_SEQUENTIAL)
+
+    def validate_days(self, value):
+        days = [day.strip().lower()[:3] for day in value.replace(';', ',').split(',') if day.strip()]
+        unknown = [day for day in days if day not in WEEKDAYS]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown weekday(s): {', '.join(unknown)}")
+        return [WEEKDAYS.index(day) for day in days]
+
+    def validate(self, data):
+        repeat_until = data.get('repeat_until')
+        if repeat_until and repeat_until < data['departure_date']:
+            raise serializers.ValidationError({"repeat_until": "Must not be before departure_date."})
+        return data
+
+
+def schedule_fields(row):
+    """
+    BusSchedule fields for a validated row: a single departure runs on
+    departure_date only, a recurring one on the matching weekdays from
+    departure_date to repeat_until.
+    """
+    start, end = row['departure_date'], row.get('repeat_until')
+    if not end:
+        return {'weekdays': BusSchedule.ALL_DAYS, 'starts_on': start, 'ends_on': start}
+    weekdays = BusSchedule.weekday_mask(row['days']) if row.get('days') else BusSchedule.ALL_DAYS
+    return {'weekdays': weekdays, 'starts_on': start, 'ends_on': end}
@@ -0,0 +1,44 @@
+# travels/bookings/serializers/route_serializers.py
+from django.conf import settings
+from rest_framework import serializers
+
+
+class RouteQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the route planner (GET /api/routes/).
+    """
+    departure = serializers.CharField(max_length=50)
+    destination = serializers.CharField(max_length=50)
+    journey_date = serializers.DateField()
+    # earliest departure on journey_date (HH:MM); defaults to midnight, or now for today
+    after = serializers.TimeField(required=False)
+    min_transfer = serializers.IntegerField(
+        min_value=0, max_value=12 * 60, default=settings.ROUTE_MIN_TRANSFER_MINUTES
+    )
+    max_legs = serializers.IntegerField(min_value=1, max_value=settings.ROUTE_MAX_LEGS, default=settings.ROUTE_MAX_LEGS)
+    limit = serializers.IntegerField(min_value=1, max_value=10, default=5)
+
+
+class RouteLegSerializer(serializers.Serializer):
+    bus = serializers.IntegerField()
+    bus_name = serializers.CharField()
+    number = serializers.CharField()
+    origin = serializers.CharField()
+    destination = serializers.CharField()
+    # stop indexes to book this leg with (see BookingCreateSerializer)
+    from_stop = serializers.IntegerField()
+    to_stop = serializers.IntegerField()
+    journey_date = serializers.DateField()
+    departs_at = serializers.DateTimeField()
+    arrives_at = serializers.DateTimeField()
+    price = serializers.DecimalField(max_digits=8, decimal_places=2)
+    seats_available = serializers.IntegerField()
+
+
+class ItinerarySerializer(serializers.Serializer):
+    departs_at = serializers.DateTimeField()
+    arrives_at = serializers.DateTimeField()
+    duration_minutes = serializers.IntegerField()
+    transfers = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    legs = RouteLegSerializer(many=True)
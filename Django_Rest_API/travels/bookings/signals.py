@@ -1,10 +1,96 @@
-
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Bus, Seat
+from django.utils import timezone
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+from .models import Bus, BusSchedule, BusStop, Trip, Seat, Booking, SeatOccupancy, BookingStats
+from .seat_layout import build_seats, sync_seats
+from .authentication import invalidate_tokens
+from . import caching
 
 @receiver(post_save, sender=Bus)
-def create_seats_for_bus(sender, instance, created, **kwargs):
+def create_seats_for_bus(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    caching.bump_fleet()
     if created:
-        for i in range(1, instance.no_of_seats +1):
-            Seat.objects.create(bus=instance, seat_number= f"S{i}")
\ No newline at end of file
+        Seat.objects.bulk_create(build_seats(instance, range(1, instance.no_of_seats + 1)))
+        # buses created without a schedule run daily from their first departure
+        BusSchedule.objects.get_or_create(bus=instance, defaults={'starts_on': timezone.localdate(instance.departure_date)})
+    else:
+        # no_of_seats or layout may have been edited
+        sync_seats(instance)
+        # so may the times of its materialized trips
+        Trip.resync(instance)
+
+
+@receiver(post_delete, sender=Bus)
+def invalidate_search_on_bus_delete(sender, instance, **kwargs):
+    caching.bump_fleet()
+
+
+@receiver(post_save, sender=BusSchedule)
+@receiver(post_delete, sender=BusSchedule)
+def sync_trips_on_schedule_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # the route planner re-reads buses by updated_at
+    Bus.objects.filter(pk=instance.bus_id).update(updated_at=timezone.now())
+    caching.bump_fleet()
+    Trip.resync(instance.bus_id)
+
+
+@receiver(post_save, sender=BusStop)
+@receiver(post_delete, sender=BusStop)
+def invalidate_route_on_stop_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # the route planner re-reads buses by updated_at
+    Bus.objects.filter(pk=instance.bus_id).update(updated_at=timezone.now())
+    caching.bump_fleet()
+
+
+@receiver(post_save, sender=Booking)
+def sync_occupancy_on_booking_save(sender, instance, created, **kwargs):
+    BookingStats.refresh(instance.user_id)
+    # New bookings have no seats yet; the m2m handler below picks them up.
+    if not created:
+        SeatOccupancy.rebuild(instance.bus_id, instance.journey_date)
+
+
+@receiver(post_delete, sender=Booking)
+def sync_occupancy_on_booking_delete(sender, instance, **kwargs):
+    BookingStats.refresh(instance.user_id)
+    SeatOccupancy.rebuild(instance.bus_id, instance.journey_date)
+
+
+@receiver(m2m_changed, sender=Booking.seats.through)
+def sync_occupancy_on_seats_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        SeatOccupancy.rebuild(instance.bus_id, instance.journey_date)
+        return
+    # seat.bookings.add(...) - rebuild every journey touched by those bookings
+    bookings = Booking.objects.filter(pk__in=pk_set or [])
+    for bus_id, journey_date in set(bookings.values_list('bus_id', 'journey_date')):
+        SeatOccupancy.rebuild(bus_id, journey_date)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_tokens_on_user_change(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    # set_password() leaves _password set until save() finishes: revoke the
+    # user's tokens (their deletion clears the cache); any other edit, like
+    # deactivation, just drops the cached copies of the user
+    tokens = Token.objects.filter(user=instance)
+    if instance._password is not None:
+        tokens.delete()
+    else:
+        invalidate_tokens(tokens.values_list('key', flat=True))
@@ -1,3 +1,630 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import override_settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import authentication, caching
+from .models import Booking, BookingSeat, Bus, BusSchedule, BusStop, SeatOccupancy, segment_mask
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Many clients booking the same seats at once: the journey's occupancy
+    lock must let exactly one booking win per seat.
+    """
+    REQUESTS = 200
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        cache.clear()
+        self.bus = Bus.objects.create(
+            bus_name='Stress', number='ST-1', origin='Delhi', destination='Agra',
+            start_time='10:00', reach_time='12:00', no_of_seats=4, price=100,
+        )
+        self.seat_ids = list(self.bus.seats.values_list('id', flat=True))
+        self.users = User.objects.bulk_create([User(username=f'user{i}') for i in range(self.REQUESTS)])
+
+    def book_in_parallel(self, seats_for_request):
+        statuses = []
+        start = threading.Barrier(self.REQUESTS)
+
+        def book(index):
+            client = APIClient()
+            client.force_authenticate(self.users[index])
+            try:
+                start.wait()
+                response = client.post('/api/booking/', {
+                    'bus': self.bus.id, 'seats': seats_for_request(index), 'journey_date': self.JOURNEY_DATE,
+                }, format='json')
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(index,)) for index in range(self.REQUESTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return Counter(statuses)
+
+    def assert_no_double_booking(self):
+        per_seat = Counter(
+            BookingSeat.objects.filter(
+                journey_date=self.JOURNEY_DATE, status__in=BookingSeat.ACTIVE_STATUSES,
+            ).values_list('seat_id', flat=True)
+        )
+        self.assertEqual(set(per_seat), set(self.seat_ids))
+        self.assertTrue(all(count == 1 for count in per_seat.values()), per_seat)
+
+    def test_one_booking_wins_per_seat(self):
+        statuses = self.book_in_parallel(lambda index: [self.seat_ids[index % len(self.seat_ids)]])
+
+        self.assertEqual(statuses, Counter({201: len(self.seat_ids), 400: self.REQUESTS - len(self.seat_ids)}))
+        self.assert_no_double_booking()
+        self.assertEqual(Booking.objects.count(), len(self.seat_ids))
+
+    def test_overlapping_multi_seat_bookings(self):
+        # pairs of seats in both orders, so lock ordering is exercised too
+        pairs = [self.seat_ids[:2], self.seat_ids[1::-1], self.seat_ids[2:], self.seat_ids[1:3]]
+        statuses = self.book_in_parallel(lambda index: pairs[index % len(pairs)])
+
+        self.assertEqual(set(statuses), {201, 400})
+        self.assertEqual(sum(statuses.values()), self.REQUESTS)
+        per_seat = Counter(
+            BookingSeat.objects.filter(journey_date=self.JOURNEY_DATE).values_list('seat_id', flat=True)
+        )
+        self.assertTrue(all(count == 1 for count in per_seat.values()), per_seat)
+        self.assertEqual(sum(per_seat.values()), 2 * statuses[201])
+
+
+class BookingHistoryQueryTests(TestCase):
+    """
+    Booking history and stats must cost a fixed number of queries however
+    many bookings, buses and seats the page holds (no per-booking or per-seat lookups).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('traveller', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_bookings(self, count):
+        for index in range(count):
+            bus = Bus.objects.create(
+                bus_name=f'Bus {index}', number=f'HB-{self.user.bookings.count()}-{index}',
+                origin='Delhi', destination='Agra', start_time='10:00', reach_time='12:00',
+                no_of_seats=4, price=100,
+            )
+            BusStop.objects.create(bus=bus, position=1, city='Mathura', minutes_from_start=60)
+            booking = Booking.objects.create(user=self.user, bus=bus, journey_date='2030-01-01')
+            booking.assign_seats(list(bus.seats.all()[:2]))
+
+    def assert_constant_queries(self, url, expected):
+        for count in (2, 10):
+            self.add_bookings(count)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_booking_history(self):
+        self.assert_constant_queries(f'/api/user/{self.user.id}/bookings/', 3)
+
+    def test_booking_stats(self):
+        self.assert_constant_queries(f'/api/user/{self.user.id}/booking-stats/', 1)
+
+    def test_booking_stats_with_bookings(self):
+        self.assert_constant_queries(f'/api/user/{self.user.id}/booking-stats/?include=bookings', 4)
+
+
+class BusSearchQueryTests(TestCase):
+    """
+    GET /api/buses/ must cost the same number of queries however many buses
+    match: seat maps, availability and booked seats are resolved in bulk.
+    """
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        self.user = User.objects.create_user('searcher', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_buses(self, count):
+        for index in range(count):
+            bus = Bus.objects.create(
+                bus_name=f'Bus {index}', number=f'SB-{Bus.objects.count()}',
+                origin='Delhi', destination='Agra', start_time='10:00', reach_time='12:00',
+                no_of_seats=8, price=100,
+            )
+            BusStop.objects.create(bus=bus, position=1, city='Mathura', minutes_from_start=60)
+            BusSchedule.objects.filter(bus=bus).update(starts_on='2020-01-01')
+            booking = Booking.objects.create(user=self.user, bus=bus, journey_date=self.JOURNEY_DATE)
+            booking.assign_seats(list(bus.seats.all()[:2]))
+
+    def test_search_query_count_is_constant(self):
+        for count in (2, 20):
+            self.add_buses(count)
+            # measure a cache miss: no cached search and trips not yet materialized for the date
+            # (includes the fleet-version aggregate the in-process cache needs, see fleet_version)
+            cache.clear()
+            with self.assertNumQueries(8):
+                response = self.client.get('/api/buses/', {'journey_date': self.JOURNEY_DATE, 'page_size': 100})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), Bus.objects.count())
+            self.assertTrue(all(sum(seat['is_booked'] for seat in bus['seats']) == 2 for bus in response.data['results']))
+
+
+class TripMaterializationTests(TestCase):
+    """
+    Trips for a searched date are materialized once per fleet version; a bus
+    added by another worker must still get its trip.
+    """
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('searcher', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_bus(self, number):
+        bus = Bus.objects.create(
+            bus_name=number, number=number, origin='Delhi', destination='Agra',
+            start_time='10:00', reach_time='12:00', no_of_seats=8, price=100,
+        )
+        BusSchedule.objects.filter(bus=bus).update(starts_on='2020-01-01')
+        return bus
+
+    def search(self, **params):
+        response = self.client.get('/api/buses/', {'journey_date': self.JOURNEY_DATE, **params})
+        self.assertEqual(response.status_code, 200)
+        return {bus['number'] for bus in response.data['results']}
+
+    def test_bus_added_by_another_worker_gets_its_trip(self):
+        self.add_bus('MT-1')
+        self.assertEqual(self.search(), {'MT-1'})
+
+        # another worker's fleet bump lands in its own in-process cache, not ours
+        version = caching.fleet_version()
+        self.add_bus('MT-2')
+        cache.set(caching.FLEET_VERSION_KEY, version)
+
+        # a query this worker hasn't cached yet
+        self.assertEqual(self.search(page_size=50), {'MT-1', 'MT-2'})
+
+
+class CacheVersionTests(TestCase):
+    """
+    Cache versions move only once a write commits: a search that read the new
+    version before commit would see the old rows and cache them under it.
+    """
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('writer', password='pw')
+        self.bus = Bus.objects.create(
+            bus_name='Versioned', number='CV-1', origin='Delhi', destination='Agra',
+            start_time='10:00', reach_time='12:00', no_of_seats=4, price=100,
+        )
+
+    def test_search_version_bumped_after_commit(self):
+        before = caching.search_version(self.JOURNEY_DATE)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(user=self.user, bus=self.bus, journey_date=self.JOURNEY_DATE)
+            booking.assign_seats(list(self.bus.seats.all()[:1]))
+            self.assertEqual(caching.search_version(self.JOURNEY_DATE), before)
+        self.assertGreater(caching.search_version(self.JOURNEY_DATE), before)
+
+    def test_fleet_version_bumped_after_commit(self):
+        before = caching.fleet_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bus.price = 120
+            self.bus.save()
+            self.assertEqual(caching.fleet_version(), before)
+        self.assertGreater(caching.fleet_version(), before)
+
+
+class ImportScheduleTests(TestCase):
+    """
+    import_schedule creates new buses, rewrites only the rows that changed,
+    and leaves unchanged buses (and their updated_at) alone.
+    """
+    HEADER = 'bus_name,number,origin,destination,start_time,reach_time,departure_date,repeat_until,no_of_seats,price\n'
+
+    def import_rows(self, *rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.HEADER + ''.join(row + '\n' for row in rows))
+        self.addCleanup(os.remove, handle.name)
+        out = StringIO()
+        call_command('import_schedule', handle.name, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_create_update_and_noop_reimport(self):
+        rows = [
+            'Morning,IM-1,Delhi,Agra,08:00,11:00,2030-01-01,2030-06-30,4,100',
+            'Evening,IM-2,Delhi,Jaipur,18:00,23:00,2030-01-01,2030-06-30,6,150',
+        ]
+        self.assertIn('2 buses created, 0 updated, 0 unchanged', self.import_rows(*rows))
+        self.assertEqual(Bus.objects.get(number='IM-2').seats.count(), 6)
+        stamps = dict(Bus.objects.values_list('number', 'updated_at'))
+
+        self.assertIn('0 buses created, 0 updated, 2 unchanged', self.import_rows(*rows))
+        self.assertEqual(dict(Bus.objects.values_list('number', 'updated_at')), stamps)
+
+        # a new price on one bus, a longer schedule on the other
+        output = self.import_rows(
+            'Morning,IM-1,Delhi,Agra,08:00,11:00,2030-01-01,2030-06-30,4,120',
+            'Evening,IM-2,Delhi,Jaipur,18:00,23:00,2030-01-01,2030-12-31,6,150',
+        )
+        self.assertIn('0 buses created, 2 updated, 0 unchanged', output)
+        self.assertEqual(Bus.objects.get(number='IM-1').price, 120)
+        self.assertEqual(str(BusSchedule.objects.get(bus__number='IM-2').ends_on), '2030-12-31')
+        for number, updated_at in Bus.objects.values_list('number', 'updated_at'):
+            self.assertGreater(updated_at, stamps[number])
+
+
+class TokenAuthenticationTests(TestCase):
+    """
+    Cached token lookups: revocations reach the per-worker LRU and the shared
+    cache, and cached entries are still checked for expiry.
+    """
+
+    def setUp(self):
+        cache.clear()
+        authentication._tokens.clear()
+        self.user = User.objects.create_user('holder', password='old-password')
+        self.token = Token.objects.create(user=self.user)
+
+    def get_stats(self, key=None):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {key or self.token.key}')
+        return client.get(f'/api/user/{self.user.id}/booking-stats/')
+
+    def seed_caches(self):
+        # as left behind by lookups in this worker and in others
+        entry = (self.user, self.token.created)
+        authentication._tokens.set(self.token.key, entry)
+        cache.set(authentication._shared_key(self.token.key), entry)
+
+    def assert_evicted(self):
+        self.assertIsNone(authentication._tokens.get(self.token.key))
+        self.assertIsNone(cache.get(authentication._shared_key(self.token.key)))
+        self.assertEqual(self.get_stats().status_code, 401)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_logout_evicts_cached_token(self):
+        self.assertEqual(self.get_stats().status_code, 200)
+        self.seed_caches()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(client.post('/api/logout/').status_code, 200)
+        self.assert_evicted()
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_password_change_evicts_cached_token(self):
+        self.assertEqual(self.get_stats().status_code, 200)
+        self.seed_caches()
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assert_evicted()
+
+    def test_cached_token_still_expires(self):
+        self.assertEqual(self.get_stats().status_code, 200)
+        with override_settings(AUTH_TOKEN_TTL=0):
+            self.assertEqual(self.get_stats().status_code, 401)
+
+    def test_deleted_token_is_rejected_once_cached(self):
+        self.assertEqual(self.get_stats().status_code, 200)
+        self.assertIsNotNone(authentication._tokens.get(self.token.key))
+        self.token.delete()
+        self.assertEqual(self.get_stats().status_code, 401)
+
+    def test_shared_cache_is_checked_before_the_local_copy(self):
+        with override_settings(AUTH_TOKEN_SHARED_CACHE=True):
+            self.assertEqual(self.get_stats().status_code, 200)
+            self.assertIsNotNone(cache.get(authentication._shared_key(self.token.key)))
+            # revoked through another worker: its delete cleared the shared cache,
+            # not this worker's LRU
+            authentication._tokens.set(self.token.key, (self.user, self.token.created))
+            Token.objects.filter(pk=self.token.pk).update(key='replaced')
+            cache.delete(authentication._shared_key(self.token.key))
+            self.assertEqual(self.get_stats().status_code, 401)
+
+
+class SegmentBookingTests(TestCase):
+    """
+    Seats are sold per route segment: bookings of one seat may share a stop
+    but never a segment, and a cancellation frees only its own segments.
+    Stops: 0 Delhi, 1 Mathura, 2 Agra.
+    """
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('rider', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.bus = Bus.objects.create(
+            bus_name='Stops', number='SG-1', origin='Delhi', destination='Agra',
+            start_time='10:00', reach_time='13:00', no_of_seats=4, price=100,
+        )
+        BusStop.objects.create(bus=self.bus, position=1, city='Mathura', minutes_from_start=90)
+        self.seat = self.bus.seats.first()
+
+    def book(self, from_stop, to_stop):
+        return self.client.post('/api/booking/', {
+            'bus': self.bus.id, 'seats': [self.seat.id], 'journey_date': self.JOURNEY_DATE,
+            'from_stop': from_stop, 'to_stop': to_stop,
+        }, format='json')
+
+    def taken(self):
+        occupancy = SeatOccupancy.for_journey(self.bus, self.JOURNEY_DATE)
+        return occupancy.taken_segments().get(self.seat.id, 0)
+
+    def test_consecutive_segments_share_a_seat(self):
+        self.assertEqual(self.book(0, 1).status_code, 201)
+        self.assertEqual(self.book(1, 2).status_code, 201)
+        self.assertEqual(self.taken(), segment_mask(0, 2))
+
+    def test_overlapping_segments_are_rejected(self):
+        self.assertEqual(self.book(0, 2).status_code, 201)
+        for from_stop, to_stop in ((0, 1), (1, 2), (0, 2)):
+            self.assertEqual(self.book(from_stop, to_stop).status_code, 400)
+        self.assertEqual(BookingSeat.objects.filter(seat=self.seat).count(), 1)
+
+    def test_assign_seats_rejects_overlaps_without_the_serializer(self):
+        # the model-level check is the last guard against double booking
+        def booking(from_stop, to_stop):
+            return Booking.objects.create(
+                user=self.user, bus=self.bus, journey_date=self.JOURNEY_DATE, from_stop=from_stop, to_stop=to_stop,
+            )
+
+        booking(0, 2).assign_seats([self.seat])
+        with self.assertRaises(ValidationError):
+            booking(1, 2).assign_seats([self.seat])
+        self.assertEqual(BookingSeat.objects.filter(seat=self.seat).count(), 1)
+
+    def test_cancel_frees_only_its_own_segment(self):
+        first = self.book(0, 1).data['id']
+        self.assertEqual(self.book(1, 2).status_code, 201)
+
+        response = self.client.post(f'/api/bookings/{first}/cancel/', {'reason': 'plans changed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.taken(), segment_mask(1, 2))
+        self.assertEqual(self.book(1, 2).status_code, 400)
+        self.assertEqual(self.book(0, 1).status_code, 201)
+
+
+class BookingBatchTests(TestCase):
+    """
+    POST /api/bookings/batch/ books every item or none, and items of one
+    batch can't claim the same seat segment twice. Stops: 0 Delhi, 1 Mathura, 2 Agra.
+    """
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('planner', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.buses = []
+        for number in ('BT-1', 'BT-2'):
+            bus = Bus.objects.create(
+                bus_name=number, number=number, origin='Delhi', destination='Agra',
+                start_time='10:00', reach_time='13:00', no_of_seats=4, price=100,
+            )
+            BusStop.objects.create(bus=bus, position=1, city='Mathura', minutes_from_start=90)
+            BusSchedule.objects.filter(bus=bus).update(starts_on='2020-01-01')
+            self.buses.append(bus)
+        self.seats = [bus.seats.first() for bus in self.buses]
+
+    def item(self, index, from_stop=0, to_stop=2):
+        return {
+            'bus': self.buses[index].id, 'seats': [self.seats[index].id], 'journey_date': self.JOURNEY_DATE,
+            'from_stop': from_stop, 'to_stop': to_stop,
+        }
+
+    def post_batch(self, *items):
+        return self.client.post('/api/bookings/batch/', {'items': list(items)}, format='json')
+
+    def test_batch_is_booked_in_full(self):
+        response = self.post_batch(self.item(0), self.item(1))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['status'] for result in response.data['results']], ['booked', 'booked'])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_one_conflicting_item_books_nothing(self):
+        Booking.objects.create(user=self.user, bus=self.buses[1], journey_date=self.JOURNEY_DATE).assign_seats(
+            [self.seats[1]]
+        )
+
+        response = self.post_batch(self.item(0), self.item(1))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.data['results']], ['not_booked', 'rejected'])
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertFalse(BookingSeat.objects.filter(seat=self.seats[0]).exists())
+
+    def test_items_cannot_claim_the_same_seat_segment(self):
+        response = self.post_batch(self.item(0, 0, 2), self.item(0, 1, 2))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.data['results']], ['not_booked', 'rejected'])
+        self.assertFalse(Booking.objects.exists())
+
+        # the same seat on consecutive segments is fine
+        response = self.post_batch(self.item(0, 0, 1), self.item(0, 1, 2))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(BookingSeat.objects.filter(seat=self.seats[0]).count(), 2)
+
+
+class ExpiredHoldTests(TestCase):
+    """
+    A held seat is freed once its hold runs out: lazily by the next booking on
+    that journey, and by the `release_expired_holds` sweeper for everything else.
+    """
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('holder', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.bus = Bus.objects.create(
+            bus_name='Hold Express', number='HL-1', origin='Delhi', destination='Agra',
+            start_time='10:00', reach_time='13:00', no_of_seats=2, price=100,
+        )
+        BusSchedule.objects.filter(bus=self.bus).update(starts_on='2020-01-01')
+        self.seat = self.bus.seats.first()
+
+    def hold_seat(self, seat=None):
+        response = self.client.post('/api/booking/', {
+            'bus': self.bus.id, 'seats': [(seat or self.seat).id], 'journey_date': self.JOURNEY_DATE, 'hold': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Booking.objects.get(pk=response.data['id'])
+
+    def expire(self, booking):
+        past = timezone.now() - timedelta(minutes=1)
+        Booking.objects.filter(pk=booking.pk).update(hold_expires_at=past)
+        BookingSeat.objects.filter(booking=booking).update(hold_expires_at=past)
+        # the occupancy row carries each hold's deadline; as if the clock had run out
+        SeatOccupancy.rebuild(self.bus.id, self.JOURNEY_DATE)
+
+    def test_held_seat_is_bookable_after_expiry(self):
+        booking = self.hold_seat()
+        self.assertEqual(self.bus.available_seats(self.JOURNEY_DATE), 1)
+        response = self.client.post('/api/booking/', {
+            'bus': self.bus.id, 'seats': [self.seat.id], 'journey_date': self.JOURNEY_DATE,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.expire(booking)
+        self.assertEqual(self.bus.available_seats(self.JOURNEY_DATE), 2)
+        response = self.client.post('/api/booking/', {
+            'bus': self.bus.id, 'seats': [self.seat.id], 'journey_date': self.JOURNEY_DATE,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, Booking.STATUS_CANCELLED)
+        self.assertEqual(booking.cancellation_reason, 'Seat hold expired')
+
+    def test_sweeper_releases_expired_holds(self):
+        expired = self.hold_seat()
+        live = self.hold_seat(self.bus.seats.exclude(pk=self.seat.pk).first())
+        self.expire(expired)
+
+        out = StringIO()
+        call_command('release_expired_holds', stdout=out)
+        self.assertIn('Released 1 expired seat hold(s)', out.getvalue())
+
+        expired.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual(expired.status, Booking.STATUS_CANCELLED)
+        self.assertEqual(live.status, Booking.STATUS_PENDING)
+        self.assertFalse(BookingSeat.objects.filter(booking=expired, status=Booking.STATUS_PENDING).exists())
+        self.assertEqual(
+            SeatOccupancy.for_journey(self.bus, self.JOURNEY_DATE).taken_set(),
+            {live.seat_links.get().seat_id},
+        )
+
+
+
+class RouteSearchTests(TestCase):
+    """
+    GET /api/routes/ over the in-memory ConnectionGraph: connections, sold-out
+    legs, trips that run past midnight, and buses edited by another worker.
+    """
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('router', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bus(self, number, origin, destination, start_time, reach_time, no_of_seats=10, stops=()):
+        bus = Bus.objects.create(
+            bus_name=number, number=number, origin=origin, destination=destination,
+            start_time=start_time, reach_time=reach_time, no_of_seats=no_of_seats, price=100,
+        )
+        for position, (city, minutes) in enumerate(stops, start=1):
+            BusStop.objects.create(bus=bus, position=position, city=city, minutes_from_start=minutes)
+        BusSchedule.objects.filter(bus=bus).update(starts_on='2020-01-01')
+        return bus
+
+    def search(self, departure, destination, **params):
+        response = self.client.get('/api/routes/', {
+            'departure': departure, 'destination': destination, 'journey_date': self.JOURNEY_DATE, **params,
+        })
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['results']
+
+    def legs(self, itinerary):
+        return [(leg['number'], leg['journey_date']) for leg in itinerary['legs']]
+
+    def test_earliest_arrival_over_a_transfer(self):
+        self.bus('AB', 'Delhi', 'Agra', '08:00', '10:00')
+        self.bus('BC-TIGHT', 'Agra', 'Gwalior', '10:15', '11:00')  # under the 30 minute transfer
+        self.bus('BC-EARLY', 'Agra', 'Gwalior', '10:45', '12:00')
+        self.bus('BC-LATE', 'Agra', 'Gwalior', '14:00', '15:00')
+
+        results = self.search('Delhi', 'Gwalior')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(self.legs(results[0]), [('AB', self.JOURNEY_DATE), ('BC-EARLY', self.JOURNEY_DATE)])
+        self.assertEqual(results[0]['transfers'], 1)
+        self.assertEqual(results[0]['duration_minutes'], 240)
+
+    def test_sold_out_leg_is_excluded(self):
+        self.bus('AB', 'Delhi', 'Agra', '08:00', '10:00')
+        full = self.bus('BC-FULL', 'Agra', 'Gwalior', '10:45', '12:00', no_of_seats=1)
+        self.bus('BC-LATE', 'Agra', 'Gwalior', '14:00', '15:00')
+        Booking.objects.create(user=self.user, bus=full, journey_date=self.JOURNEY_DATE).assign_seats(
+            list(full.seats.all())
+        )
+
+        results = self.search('Delhi', 'Gwalior')
+        self.assertEqual([self.legs(itinerary) for itinerary in results], [
+            [('AB', self.JOURNEY_DATE), ('BC-LATE', self.JOURNEY_DATE)],
+        ])
+        self.assertEqual(results[0]['legs'][1]['seats_available'], 10)
+
+    def test_connection_after_an_overnight_leg(self):
+        self.bus('AB-NIGHT', 'Delhi', 'Agra', '20:00', '02:00')
+        self.bus('BC-DAWN', 'Agra', 'Gwalior', '03:00', '05:00')
+
+        results = self.search('Delhi', 'Gwalior')
+        self.assertEqual(self.legs(results[0]), [('AB-NIGHT', '2030-01-01'), ('BC-DAWN', '2030-01-02')])
+        self.assertEqual(results[0]['duration_minutes'], 9 * 60)
+
+    def test_boarding_at_a_stop_reached_after_midnight(self):
+        # the trip reaching Agra at 02:00 on the searched date left Delhi the evening before
+        self.bus('NIGHT', 'Delhi', 'Gwalior', '22:00', '06:00', stops=[('Agra', 4 * 60)])
+
+        results = self.search('Agra', 'Gwalior')
+        self.assertEqual(self.legs(results[0]), [('NIGHT', '2029-12-31')])
+        leg = results[0]['legs'][0]
+        self.assertEqual((leg['from_stop'], leg['to_stop']), (1, 2))
+        self.assertTrue(leg['departs_at'].startswith('2030-01-01T02:00'))
+
+    def test_graph_picks_up_a_bus_edited_by_another_worker(self):
+        bus = self.bus('AB', 'Delhi', 'Agra', '08:00', '10:00')
+        self.assertEqual(self.search('Delhi', 'Agra')[0]['duration_minutes'], 120)
+
+        # a queryset update sends no signals, so this process's cache is never
+        # bumped: as if the edit had been made by another worker
+        Bus.objects.filter(pk=bus.pk).update(reach_time='11:30', updated_at=timezone.now())
+
+        self.assertEqual(self.search('Delhi', 'Agra')[0]['duration_minutes'], 210)
@@ -1,15 +1,28 @@
 from django.urls import path
-from .views.auth_views import RegisterView, LoginView
-from .views.bus_views import BusListCreateView, BusDetailView
-from .views.booking_views import BookingView, UserBookingView, CancelBookingView
+from .views.auth_views import RegisterView, LoginView, LogoutView
+from .views.bus_views import BusListCreateView, BusDetailView, city_autocomplete
+from .views.booking_views import BookingView, BookingBatchView, UserBookingView, CancelBookingView
 from .views.stats_views import booking_stats
+from .views.route_views import route_search
+from .views.stream_views import seat_events, seat_events_ticket
+from .views import async_views
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('buses/', BusListCreateView.as_view(), name='buslist'),
     path('buses/<int:pk>/', BusDetailView.as_view(), name='bus-detail'),
+    path('buses/<int:pk>/seat-events/', seat_events, name='bus-seat-events'),
+    path('buses/<int:pk>/seat-events/ticket/', seat_events_ticket, name='bus-seat-events-ticket'),
+    path('cities/', city_autocomplete, name='city-autocomplete'),
+    path('routes/', route_search, name='route-search'),
     path('booking/', BookingView.as_view(), name='booking'),
+    path('bookings/batch/', BookingBatchView.as_view(), name='booking-batch'),
     path('user/<int:user_id>/bookings/', UserBookingView.as_view(), name='user-bookings'),
     path('user/<int:user_id>/booking-stats/', booking_stats, name='user-booking-stats'),
     path('bookings/<int:booking_id>/cancel/', CancelBookingView.as_view(), name='cancel-booking'),
+    # async variants of the read-heavy endpoints (served by travels.asgi)
+    path('async/buses/', async_views.bus_search, name='async-buslist'),
+    path('async/buses/<int:pk>/', async_views.bus_detail, name='async-bus-detail'),
+    path('async/user/<int:user_id>/bookings/', async_views.user_bookings, name='async-user-bookings'),
 ]
@@ -0,0 +1,128 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .. import caching
+from ..authentication import aget_token_user
+from ..models import Booking, Bus, SeatOccupancy
+from ..pagination import BookingCursorPagination, BusCursorPagination
+from ..serializers.booking_serializers import BookingHistorySerializer
+from ..serializers.bus_serializers import BusSerializer
+from .bus_views import (
+    materialize_trips, search_cache_until, search_queryset, seat_map_etag_queryset, segments_from_params
+)
+
+# Async twins of the read-only search, bus detail and booking history views,
+# for the ASGI server. Rows are fetched with the async ORM and handed to the
+# same serializers fully loaded, so serializing never touches the database
+# and a request holds no thread while it waits on the database or the client.
+
+
+def _json(data, status=200, headers=None):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, headers=headers, content_type='application/json'
+    )
+
+
+def async_api_view(view):
+    """
+    GET-only, token-authenticated async view. The view gets a DRF Request
+    (query_params, user) and may raise DRF exceptions like NotFound.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return _json({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        user = await aget_token_user(request)
+        if user is None:
+            return _json({'detail': 'Authentication credentials were not provided.'}, status=401)
+        drf_request = Request(request)
+        drf_request.user = user
+        try:
+            return await view(drf_request, *args, **kwargs)
+        except APIException as exc:
+            return _json({'detail': exc.detail}, status=exc.status_code)
+    return wrapper
+
+
+@async_api_view
+async def bus_search(request):
+    """
+    Async GET /api/buses/: same parameters, response and cache as BusListCreateView.
+    """
+    journey_date = request.query_params.get('journey_date')
+    cache_date = journey_date or str(timezone.now().date())
+    key = await sync_to_async(caching.search_key)(request.get_host(), request.query_params.dict())
+    version = await sync_to_async(caching.search_version)(cache_date)
+    data = await sync_to_async(caching.get_search)(key, version)
+    if data is not None:
+        return _json(data)
+
+    await sync_to_async(materialize_trips)(request.query_params)
+    paginator = BusCursorPagination()
+    buses = await paginator.apaginate_queryset(search_queryset(request.query_params), request)
+    context = {'request': request, 'journey_date': journey_date}
+    if journey_date:
+        context['booked_seats_by_bus'] = await SeatOccupancy.abooked_seats_by_bus(buses, journey_date)
+    data = paginator.get_paginated_response(BusSerializer(buses, many=True, context=context).data).data
+
+    until = await sync_to_async(search_cache_until)(cache_date)
+    await sync_to_async(caching.set_search)(key, version, data, until)
+    return _json(data)
+
+
+@async_api_view
+async def bus_detail(request, pk):
+    """
+    Async GET /api/buses/<pk>/: same response and ETag/304 handling as BusDetailView.
+    """
+    journey_date = request.query_params.get('journey_date')
+    occupancy = None
+    if journey_date:
+        occupancy = await seat_map_etag_queryset(pk, journey_date).afirst()
+        if occupancy is not None:
+            etag = occupancy.seat_map_etag(occupancy.bus.updated_at)
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                return HttpResponse(status=304, headers={'ETag': etag})
+
+    bus = await (
+        Bus.objects.prefetch_related('seats', 'stops')
+        .with_availability(journey_date or timezone.now().date())
+        .filter(pk=pk).afirst()
+    )
+    if bus is None:
+        raise NotFound('No Bus matches the given query.')
+
+    segments = segments_from_params(request.query_params)
+    context = {'request': request, 'journey_date': journey_date, 'segments': segments}
+    headers = {}
+    if journey_date:
+        if occupancy is None:
+            occupancy = await SeatOccupancy.afor_journey(bus, journey_date)
+        context['booked_seats_by_bus'] = {bus.id: occupancy.taken_set(segments=segments)}
+        headers['ETag'] = occupancy.seat_map_etag(bus.updated_at)
+    return _json(BusSerializer(bus, context=context).data, headers=headers)
+
+
+@async_api_view
+async def user_bookings(request, user_id):
+    """
+    Async GET /api/user/<user_id>/bookings/: same response as UserBookingView.
+    """
+    if request.user.id != user_id:
+        return _json({'error': 'Unauthorized'}, status=401)
+
+    bookings = Booking.objects.filter(user_id=user_id)
+    status_filter = request.query_params.get('status')
+    if status_filter:
+        bookings = bookings.filter(status=status_filter)
+
+    paginator = BookingCursorPagination()
+    page = await paginator.apaginate_queryset(bookings.for_history(), request)
+    return _json(paginator.get_paginated_response(BookingHistorySerializer(page, many=True).data).data)
@@ -1,9 +1,10 @@
 from django.contrib.auth import authenticate
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from ..authentication import issue_token
 from ..serializers.user_serializers import UserRegisterSerializer
 
 import logging
@@ -18,7 +19,7 @@ class RegisterView(APIView):
             serializer = UserRegisterSerializer(data=request.data)
             if serializer.is_valid():
                 user = serializer.save()
-                token, _ = Token.objects.get_or_create(user=user)
+                token = issue_token(user)
                 return Response({
                     "status": "success",
                     "message": "Registration successful",
@@ -48,7 +49,7 @@ class LoginView(APIView):
             user = authenticate(username=username, password=password)
             if not user:
                 return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-            token, _ = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
             return Response({
                 'token': token.key,
                 'user': {
@@ -62,3 +63,12 @@ class LoginView(APIView):
         except Exception as e:
             logger.error(f"Login error: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # deleting the token also evicts it from the auth caches (see signals.py)
+        Token.objects.filter(key=request.auth.key).delete()
+        return Response({'status': 'success', 'message': 'Logged out'})
@@ -4,7 +4,10 @@ from rest_framework import status
 from django.db import transaction
 from django.db.models import F
 from ..models import Booking, Seat, Bus
-from ..serializers.booking_serializers import BookingSerializer, BookingCreateSerializer
+from ..serializers.booking_serializers import (
+    BookingSerializer, BookingCreateSerializer, BookingBatchSerializer, BookingHistorySerializer
+)
+from ..pagination import BookingCursorPagination
 from django.utils import timezone
 import logging
 from rest_framework.permissions import IsAuthenticated
@@ -22,8 +25,9 @@ class BookingView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Serializer ke andar save ke time seat lock hoga
-            booking = serializer.save()
+            # Seats are locked during validation; a failed save rolls back to here
+            with transaction.atomic():
+                booking = serializer.save()
             return Response(
                 BookingSerializer(booking).data,
                 status=status.HTTP_201_CREATED
@@ -36,6 +40,37 @@ class BookingView(APIView):
             )
 
 
+class BookingBatchView(APIView):
+    """
+    POST /api/bookings/batch/: {"items": [booking, ...], "hold": false},
+    where each booking has the fields of POST /api/booking/. Either every
+    item is booked (201) or none is (400). Both responses list a result
+    per item, in request order.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @transaction.atomic
+    def post(self, request):
+        serializer = BookingBatchSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            # {item index: errors} when items were rejected, a plain error list otherwise
+            item_errors = serializer.errors.get('items')
+            if not isinstance(item_errors, dict) or not all(isinstance(index, int) for index in item_errors):
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'results': [
+                {'index': index, 'status': 'rejected', 'errors': item_errors[index]}
+                if index in item_errors else {'index': index, 'status': 'not_booked'}
+                for index in range(len(serializer.initial_data['items']))
+            ]}, status=status.HTTP_400_BAD_REQUEST)
+
+        bookings = serializer.save()
+        booked = Booking.objects.filter(pk__in=[booking.pk for booking in bookings]).for_history().in_bulk()
+        return Response({'results': [
+            {'index': index, 'status': 'booked', 'booking': BookingHistorySerializer(booked[booking.pk]).data}
+            for index, booking in enumerate(bookings)
+        ]}, status=status.HTTP_201_CREATED)
+
+
 class UserBookingView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -51,9 +86,10 @@ class UserBookingView(APIView):
         if status_filter:
             bookings = bookings.filter(status=status_filter)
 
-        bookings = bookings.order_by('-booking_time')
-        serializer = BookingSerializer(bookings, many=True)
-        return Response(serializer.data)
+        paginator = BookingCursorPagination()
+        page = paginator.paginate_queryset(bookings.for_history(), request, view=self)
+        serializer = BookingHistorySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class CancelBookingView(APIView):
@@ -1,52 +1,124 @@
 from rest_framework import generics
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from ..models import Bus, Booking
+from rest_framework.response import Response
+from rest_framework import status
+from django.utils.http import parse_etags
+from ..models import Booking, Bus, SeatOccupancy, Trip, normalize_city, segment_mask
+from .. import caching
+from ..pagination import BusCursorPagination
 from ..serializers.bus_serializers import BusSerializer
-from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+CITY_SUGGESTION_LIMIT = 10
+
+def search_queryset(query_params):
+    """
+    Buses matching a search request (shared by the sync and async search views).
+    """
+    # seats and stops are prefetched so nested seat maps don't query per bus
+    queryset = Bus.objects.prefetch_related('seats', 'stops')
+    departure = query_params.get('departure')
+    destination = query_params.get('destination')
+    journey_date = query_params.get('journey_date')
+
+    # prefix match on indexed city keys; ?match=exact for exact city lookup
+    exact = query_params.get('match') == 'exact'
+    queryset = queryset.on_route(departure, destination, exact=exact)
+
+    # availability is computed in SQL; fully booked buses are dropped for a searched date
+    queryset = queryset.with_availability(journey_date or timezone.now().date())
+    if journey_date:
+        # only buses with a trip that day (see materialize_trips)
+        queryset = queryset.filter(
+            trips__service_date=journey_date, trips__status=Trip.STATUS_SCHEDULED, is_full=False
+        )
+
+    return queryset
+
+
+def search_cache_until(journey_date):
+    """
+    How long a search for journey_date may be cached: until the date's next
+    hold expiry frees seats (None when no hold is running).
+    """
+    try:
+        service_date = parse_date(journey_date)
+    except ValueError:
+        service_date = None
+    return Booking.next_hold_expiry(service_date) if service_date else None
+
+
+def segments_from_params(query_params):
+    """
+    Segment mask for ?from_stop=&to_stop= (seat maps for part of the route),
+    or None for the whole route when they're missing or invalid.
+    """
+    try:
+        from_stop, to_stop = int(query_params['from_stop']), int(query_params['to_stop'])
+    except (KeyError, ValueError):
+        return None
+    if not 0 <= from_stop < to_stop:
+        return None
+    return segment_mask(from_stop, to_stop)
+
+
+def materialize_trips(query_params):
+    """
+    Create the searched date's trip rows before searching it (only the first
+    search for a date under the current fleet version does any work).
+    """
+    try:
+        service_date = parse_date(query_params.get('journey_date') or '')
+    except ValueError:
+        service_date = None
+    if service_date:
+        Trip.materialize(service_date)
+
+
+def seat_map_etag_queryset(bus_id, journey_date):
+    """
+    The occupancy row (with the bus's updated_at) behind a seat map's ETag.
+    """
+    return (
+        SeatOccupancy.objects.filter(bus_id=bus_id, journey_date=journey_date)
+        .select_related('bus').only('bus_id', 'journey_date', 'booked_segments', 'held_segments', 'version', 'bus__updated_at')
+    )
+
 
 class BusListCreateView(generics.ListCreateAPIView):
     queryset = Bus.objects.all()
     serializer_class = BusSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = BusCursorPagination
 
     def get_queryset(self):
-        queryset = Bus.objects.all()
-        departure = self.request.query_params.get('departure')
-        destination = self.request.query_params.get('destination')
-        journey_date = self.request.query_params.get('journey_date')
-
-        if departure:
-            queryset = queryset.filter(origin__icontains=departure)
-        if destination:
-            queryset = queryset.filter(destination__icontains=destination)
-
-        if journey_date:
-            # Get all buses fully booked on this date
-            booked_counts = (
-                Booking.objects.filter(
-                    journey_date=journey_date,
-                    status='confirmed'
-                )
-                .values('bus')
-                .annotate(booked_seats_count=Count('seats'))  # count seats per bus
-            )
-            
-            fully_booked_ids = [
-                b['bus'] for b in booked_counts
-                if Bus.objects.filter(id=b['bus'], no_of_seats__lte=b['booked_seats_count']).exists()
-            ]
-            queryset = queryset.exclude(id__in=fully_booked_ids)
-
-        return queryset
+        materialize_trips(self.request.query_params)
+        return search_queryset(self.request.query_params)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['journey_date'] = self.request.query_params.get('journey_date')
         return context
 
+    def list(self, request, *args, **kwargs):
+        # Results only change when the fleet changes, a booking write happens
+        # on this date (both bump a version token) or a hold runs out.
+        journey_date = request.query_params.get('journey_date') or str(timezone.now().date())
+        key = caching.search_key(request.get_host(), request.query_params.dict())
+        version = caching.search_version(journey_date)
+        data = caching.get_search(key, version)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        caching.set_search(key, version, response.data, until=search_cache_until(journey_date))
+        return response
+
 
 class BusDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Bus.objects.all()
+    queryset = Bus.objects.prefetch_related('seats', 'stops')
     serializer_class = BusSerializer
     permission_classes = [IsAuthenticated]
 
@@ -54,4 +126,56 @@ class BusDetailView(generics.RetrieveUpdateDestroyAPIView):
         context = super().get_serializer_context()
         # Pass journey_date to serializer so that seats can show is_booked correctly
         context['journey_date'] = self.request.query_params.get('journey_date')
+        # ?from_stop=&to_stop= shows the seats free on that part of the route
+        context['segments'] = segments_from_params(self.request.query_params)
         return context
+
+    def retrieve(self, request, *args, **kwargs):
+        # Polling clients send If-None-Match; an unchanged seat map is a 304
+        # decided from the occupancy row alone, without serializing seats.
+        etag = self.get_seat_map_etag()
+        if etag and etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = super().retrieve(request, *args, **kwargs)
+        etag = etag or self.get_seat_map_etag()
+        if etag:
+            response['ETag'] = etag
+        return response
+
+    def get_seat_map_etag(self):
+        journey_date = self.request.query_params.get('journey_date')
+        if not journey_date:
+            return None
+        occupancy = seat_map_etag_queryset(self.kwargs['pk'], journey_date).first()
+        if occupancy is None:
+            return None
+        return occupancy.seat_map_etag(occupancy.bus.updated_at)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def city_autocomplete(request):
+    """
+    City name suggestions for the search box: ?q=<prefix>&field=origin|destination
+    """
+    prefix = normalize_city(request.query_params.get('q'))
+    if not prefix:
+        return Response([])
+
+    fields = [request.query_params.get('field')]
+    if fields[0] not in ('origin', 'destination'):
+        fields = ['origin', 'destination']
+
+    # one display name per normalized city, so "Delhi" and " delhi " collapse
+    cities = {}
+    for field in fields:
+        rows = (
+            Bus.objects.filter(**{f'{field}_key__startswith': prefix})
+            .order_by(f'{field}_key')
+            .values_list(f'{field}_key', field)
+            .distinct()[:CITY_SUGGESTION_LIMIT * 2]
+        )
+        for key, name in rows:
+            cities.setdefault(key, " ".join(name.split()))
+    return Response([cities[key] for key in sorted(cities)][:CITY_SUGGESTION_LIMIT])
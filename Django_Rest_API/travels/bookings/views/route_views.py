@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from ..models import normalize_city
+from ..routing import find_itineraries
+from ..serializers.route_serializers import ItinerarySerializer, RouteQuerySerializer
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def route_search(request):
+    """
+    Direct and connecting itineraries between two cities on a date:
+    ?departure=&destination=&journey_date=YYYY-MM-DD[&after=HH:MM&min_transfer=&max_legs=&limit=]
+
+    Planned over the in-memory connection graph (bookings/routing.py), so no
+    query per candidate route; only the returned legs are checked for free seats.
+    """
+    query = RouteQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = query.validated_data
+
+    journey_date = params['journey_date']
+    after = params.get('after')
+    if after is None and journey_date == timezone.localdate():
+        after = timezone.localtime().time()
+
+    itineraries = find_itineraries(
+        normalize_city(params['departure']),
+        normalize_city(params['destination']),
+        journey_date,
+        after=after.hour * 60 + after.minute if after else 0,
+        min_transfer=params['min_transfer'],
+        max_wait=settings.ROUTE_MAX_TRANSFER_MINUTES,
+        max_legs=params['max_legs'],
+        limit=params['limit'],
+    )
+    return Response({'results': ItinerarySerializer(itineraries, many=True).data})
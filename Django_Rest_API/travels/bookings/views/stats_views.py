@@ -1,10 +1,10 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.utils import timezone
-from django.db.models import Count, Q
-from ..models import Booking
-from ..serializers.booking_serializers import BookingSerializer
+from ..models import Booking, BookingStats
+from ..serializers.action_serializers import UserBookingStatsSerializer
+from ..serializers.booking_serializers import BookingHistorySerializer
+from ..pagination import BookingCursorPagination
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -12,21 +12,18 @@ def booking_stats(request, user_id):
     if request.user.id != user_id:
         return Response({'error': 'Unauthorized'}, status=401)
 
-    today = timezone.now().date()
+    # Stats come from the per-user counter row (one lookup)
+    stats = UserBookingStatsSerializer(BookingStats.for_user(user_id)).data
+    if request.query_params.get('include') != 'bookings':
+        return Response({'stats': stats})
 
-    # Stats aggregation
-    stats = Booking.objects.filter(user_id=user_id).aggregate(
-        total_bookings=Count('id'),
-        active_bookings=Count('id', filter=Q(status='confirmed') & Q(journey_date__gte=today)),
-        past_bookings=Count('id', filter=Q(status='confirmed') & Q(journey_date__lt=today)),
-        cancelled_bookings=Count('id', filter=Q(status='cancelled'))
-    )
-
-    # Booking details
-    bookings = Booking.objects.filter(user_id=user_id).order_by('-booking_time')
-    booking_data = BookingSerializer(bookings, many=True).data
+    # ?include=bookings adds recent bookings, one page at a time (follow `next` for older ones)
+    paginator = BookingCursorPagination()
+    bookings = paginator.paginate_queryset(Booking.objects.filter(user_id=user_id).for_history(), request)
+    booking_data = BookingHistorySerializer(bookings, many=True).data
 
     return Response({
         'stats': stats,
-        'bookings': booking_data
+        'bookings': booking_data,
+        'next': paginator.get_next_link()
     })
@@ -0,0 +1,88 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .. import events
+from ..authentication import aget_ticket_user, aget_token_user, issue_stream_ticket
+from ..models import Bus, SeatOccupancy
+
+# comment line sent when nothing happened, keeps proxies from closing the stream
+HEARTBEAT_SECONDS = 15
+
+
+def _sse(message, event='seats'):
+    return f"event: {event}\ndata: {message}\n\n"
+
+
+async def _seat_event_stream(bus_id, journey_date):
+    # subscribe first, then read the current state: a change landing in
+    # between shows up as an event with a higher version, never as a gap
+    subscription = await events.get_broker().subscribe(events.seat_channel(bus_id, journey_date))
+    pending = None
+    try:
+        occupancy = await sync_to_async(SeatOccupancy.for_journey)(bus_id, journey_date)
+        yield _sse(events.seat_state_message(occupancy))
+        while True:
+            pending = pending or asyncio.ensure_future(anext(subscription))
+            done, _ = await asyncio.wait({pending}, timeout=HEARTBEAT_SECONDS)
+            if not done:
+                yield ": heartbeat\n\n"
+                continue
+            message, pending = pending.result(), None
+            yield _sse(message)
+    finally:
+        # client went away: stop the pending read before closing the subscription
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await subscription.aclose()
+
+
+async def seat_events(request, pk):
+    """
+    Server-sent events for one bus on one journey date:
+    GET /api/buses/<pk>/seat-events/?journey_date=YYYY-MM-DD
+
+    Sends the seat state on connect, then one `seats` event (full booked/held
+    lists plus the `changed` seat ids) after every booking, hold or cancellation
+    on that journey. Needs the ASGI server (travels.asgi).
+
+    Authenticated by the Authorization header or, for browser EventSource
+    (which can't set headers), by ?ticket= from seat_events_ticket.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user = await aget_token_user(request)
+    if user is None and request.GET.get('ticket'):
+        user = await aget_ticket_user(request.GET['ticket'], pk)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    try:
+        journey_date = parse_date(request.GET.get('journey_date') or '')
+    except ValueError:
+        journey_date = None
+    if journey_date is None:
+        return HttpResponseBadRequest('journey_date (YYYY-MM-DD) is required')
+    if not await Bus.objects.filter(pk=pk).aexists():
+        raise Http404('Bus not found')
+
+    response = StreamingHttpResponse(_seat_event_stream(pk, journey_date), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def seat_events_ticket(request, pk):
+    """
+    Short-lived ticket for opening GET /api/buses/<pk>/seat-events/?ticket=...
+    """
+    if not Bus.objects.filter(pk=pk).exists():
+        raise Http404('Bus not found')
+    return Response({'ticket': issue_stream_ticket(request.user, pk)})
@@ -0,0 +1,113 @@
+# travels/payments/fake_gateway.py
+"""
+Local stand-in for the Razorpay orders API, for tests and benchmarks:
+
+    python -m payments.fake_gateway --port 9100 --latency 0.3 --failure-rate 0.1
+
+then set PAYMENT_GATEWAY_URL=http://127.0.0.1:9100/v1. Responses are delayed
+by --latency seconds and --failure-rate of requests get a 503, so timeouts
+and retries can be exercised without the real gateway.
+"""
+import argparse
+import json
+import random
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so client connection pooling is exercised
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        with self.server.lock:
+            self.server.requests_received += 1
+        if self.path.rstrip('/') != '/v1/orders':
+            return self._reply(404, {'error': {'description': 'The requested URL was not found on the server.'}})
+        if not self.headers.get('Authorization', '').startswith('Basic '):
+            return self._reply(401, {'error': {'description': 'Authentication failed'}})
+
+        time.sleep(self.server.latency)
+        if random.random() < self.server.failure_rate:
+            return self._reply(503, {'error': {'description': 'Service unavailable'}})
+
+        try:
+            data = json.loads(body or b'{}')
+            amount = int(data['amount'])
+        except (ValueError, KeyError, TypeError):
+            return self._reply(400, {'error': {'description': 'amount is required'}})
+        with self.server.lock:
+            self.server.orders_created += 1
+        self._reply(200, {
+            'id': f"order_{secrets.token_hex(7)}",
+            'entity': 'order',
+            'amount': amount,
+            'amount_paid': 0,
+            'amount_due': amount,
+            'currency': data.get('currency', 'INR'),
+            'receipt': data.get('receipt'),
+            'status': 'created',
+            'attempts': 0,
+            'notes': data.get('notes') or [],
+            'created_at': int(time.time()),
+        })
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # a client that timed out and hung up is expected here, not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, verbose=False):
+    """
+    Build (not start) a fake gateway server; port=0 picks a free port (see server.server_port).
+    """
+    server = FakeGatewayServer((host, port), FakeGatewayHandler)
+    server.latency = latency
+    server.failure_rate = failure_rate
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.requests_received = 0  # every POST, retries included
+    server.orders_created = 0
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Razorpay orders API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds to wait before answering.")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests answered with 503.")
+    parser.add_argument('--verbose', action='store_true')
+    options = parser.parse_args()
+
+    server = make_server(options.host, options.port, options.latency, options.failure_rate, options.verbose)
+    print(f"Fake gateway on http://{options.host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+# travels/payments/gateway.py
+import asyncio
+import hashlib
+import hmac
+import logging
+import random
+import time
+import weakref
+
+import httpx
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """The gateway rejected the request, or could not be reached within the retry budget."""
+
+
+class SignatureError(GatewayError):
+    """A payment or webhook signature did not match."""
+
+
+class RazorpayGateway:
+    """
+    Razorpay REST client. Connections are pooled and kept alive across
+    requests, every call has connect/read timeouts, and transient failures
+    (connection errors, timeouts, 429 and 5xx) are retried with exponential
+    backoff and jitter. POSTs are only retried when they never reached the
+    gateway (connect errors, 429). Each call has a sync and an async
+    (a-prefixed) form.
+
+    Configured by the PAYMENT_GATEWAY_* settings; pointing PAYMENT_GATEWAY_URL
+    at payments/fake_gateway.py gives a local stand-in for tests and benchmarks.
+    """
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # a retried POST can create a second order, so it's only retried when
+    # the gateway can't have acted on it (see _retryable)
+    IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+    def __init__(self):
+        self.base_url = settings.PAYMENT_GATEWAY_URL.rstrip('/')
+        self.key_id = settings.RAZORPAY_KEY_ID
+        self.key_secret = settings.RAZORPAY_KEY_SECRET
+        self.retries = settings.PAYMENT_GATEWAY_RETRIES
+        self.backoff = settings.PAYMENT_GATEWAY_BACKOFF
+        self._client_options = {
+            'base_url': self.base_url,
+            'auth': (self.key_id, self.key_secret),
+            'timeout': httpx.Timeout(
+                settings.PAYMENT_GATEWAY_TIMEOUT, connect=settings.PAYMENT_GATEWAY_CONNECT_TIMEOUT
+            ),
+            'limits': httpx.Limits(
+                max_connections=settings.PAYMENT_GATEWAY_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PAYMENT_GATEWAY_MAX_CONNECTIONS,
+            ),
+        }
+        self._client = httpx.Client(**self._client_options)
+        # event loop -> AsyncClient; pooled connections belong to the loop that opened them
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    # orders
+
+    def create_order(self, amount, currency='INR', receipt=None, notes=None):
+        """
+        Create an order for `amount` in the currency's smallest unit (paise) and return it.
+        """
+        return self._request('POST', '/orders', json=self._order_body(amount, currency, receipt, notes))
+
+    async def acreate_order(self, amount, currency='INR', receipt=None, notes=None):
+        return await self._arequest('POST', '/orders', json=self._order_body(amount, currency, receipt, notes))
+
+    @staticmethod
+    def _order_body(amount, currency, receipt, notes):
+        body = {'amount': amount, 'currency': currency, 'payment_capture': 1}
+        if receipt:
+            body['receipt'] = receipt
+        if notes:
+            body['notes'] = notes
+        return body
+
+    # signatures (local HMAC checks, no network)
+
+    def verify_payment_signature(self, order_id, payment_id, signature):
+        self._verify(f"{order_id}|{payment_id}".encode('utf-8'), signature, self.key_secret)
+
+    def verify_webhook_signature(self, body, signature):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self._verify(body, signature, settings.RAZORPAY_WEBHOOK_SECRET)
+
+    @staticmethod
+    def _verify(message, signature, secret):
+        expected = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, signature or ''):
+            raise SignatureError("Signature verification failed")
+
+    # transport
+
+    def _request(self, method, path, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._client.request(method, path, **kwargs)
+            except httpx.TransportError as exc:  # connect/read timeouts included
+                error = exc
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    return self._result(response)
+                error = response
+            if attempt == self.retries or not self._retryable(method, error):
+                break
+            time.sleep(self._delay(attempt, method, path, error))
+        raise self._give_up(error)
+
+    async def _arequest(self, method, path, **kwargs):
+        client = self._async_client()
+        for attempt in range(self.retries + 1):
+            try:
+                response = await client.request(method, path, **kwargs)
+            except httpx.TransportError as exc:
+                error = exc
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    return self._result(response)
+                error = response
+            if attempt == self.retries or not self._retryable(method, error):
+                break
+            await asyncio.sleep(self._delay(attempt, method, path, error))
+        raise self._give_up(error)
+
+    def _async_client(self):
+        """
+        The running loop's pooled AsyncClient (under ASGI, one per worker for
+        its whole life), opened on first use.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._async_clients[loop] = httpx.AsyncClient(**self._client_options)
+        return client
+
+    async def aclose(self):
+        """
+        Close the running loop's AsyncClient (ASGI lifespan shutdown, see travels/asgi.py).
+        """
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _retryable(self, method, error):
+        if method in self.IDEMPOTENT_METHODS:
+            return True
+        # the gateway may have acted on a request that timed out or got a 5xx
+        if isinstance(error, httpx.Response):
+            return error.status_code == 429
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+    def _delay(self, attempt, method, path, error):
+        delay = self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+        logger.warning("Gateway %s %s failed (%s), retrying in %.2fs", method, path, self._describe(error), delay)
+        return delay
+
+    @staticmethod
+    def _describe(error):
+        if isinstance(error, httpx.Response):
+            return f"HTTP {error.status_code}"
+        return type(error).__name__
+
+    def _give_up(self, error):
+        return GatewayError(f"Payment gateway unavailable ({self._describe(error)})")
+
+    @staticmethod
+    def _result(response):
+        try:
+            data = response.json()
+        except ValueError:
+            raise GatewayError(f"Invalid gateway response (HTTP {response.status_code})")
+        if response.is_error:
+            description = (data.get('error') or {}).get('description') if isinstance(data, dict) else None
+            raise GatewayError(description or f"Gateway rejected the request (HTTP {response.status_code})")
+        return data
+
+
+_gateway = None
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        _gateway = import_string(getattr(settings, 'PAYMENT_GATEWAY', 'payments.gateway.RazorpayGateway'))()
+    return _gateway
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import apply_pending
+
+
+class Command(BaseCommand):
+    help = "Apply stored payment webhook events to payments, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="Keep running and poll for new events every N seconds (default: drain the queue once and exit).",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            processed = 0
+            while True:
+                applied = apply_pending(batch_size=options['batch_size'])
+                processed += applied
+                if applied < options['batch_size']:
+                    break
+            if processed or not interval:
+                self.stdout.write(f"Applied {processed} webhook event(s)")
+            if not interval:
+                break
+            time.sleep(interval)
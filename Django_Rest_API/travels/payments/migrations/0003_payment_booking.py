@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0019_seatoccupancy_version'),
+        ('payments', '0002_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='booking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='bookings.booking'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['order_id', 'status'], name='payment_order_status_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_payment_booking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('created', 'created'), ('paid', 'paid'), ('failed', 'failed'), ('refund_due', 'refund due')], default='created', max_length=16),
+        ),
+    ]
@@ -1,17 +1,119 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.auth.models import User
+from bookings.models import Booking, BookingSeat
 
 class Payment(models.Model):
     STATUS = [
         ("created", "created"),
         ("paid", "paid"),
         ("failed", "failed"),
+        # money was taken but the booking can't be confirmed with it
+        ("refund_due", "refund due"),
     ]
     order_id = models.CharField(max_length=64, unique=True)
     payment_id = models.CharField(max_length=64, blank=True, null=True)
     signature = models.TextField(blank=True, null=True)
-    amount = models.IntegerField()  # paise
+    amount = models.DecimalField(max_digits=12, decimal_places=2)  # rupees
     currency = models.CharField(max_length=8, default="INR")
     status = models.CharField(max_length=16, choices=STATUS, default="created")
     receipt = models.CharField(max_length=64, blank=True, null=True)
     notes = models.JSONField(default=dict, blank=True)
+    # who created the order; only their own bookings can be paid with it
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name="payments")
+    # the (held) booking this order pays for; confirmed when the payment goes through
+    booking = models.ForeignKey(
+        "bookings.Booking", on_delete=models.SET_NULL, blank=True, null=True, related_name="payments"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["order_id", "status"], name="payment_order_status_idx"),
+        ]
+
+    @staticmethod
+    def payable_error(booking, user_id, amount):
+        """
+        Why `amount` (rupees) paid by `user_id` can't pay for `booking`
+        (annotated with total_price), or None if it can.
+        """
+        if booking is None:
+            return "Unknown booking"
+        if user_id is None or booking.user_id != user_id:
+            return "This booking belongs to another user"
+        if booking.status not in BookingSeat.ACTIVE_STATUSES:
+            return "This booking can no longer be paid for"
+        if amount != booking.total_price:
+            return f"Amount must be the booking total ({booking.total_price:.2f})"
+        return None
+
+    @classmethod
+    def confirm(cls, order_id, payment_id=None, signature=None, booking_id=None):
+        """
+        Mark the order paid and confirm its booking, in one transaction.
+        booking_id links an order that was created without one. Safe to
+        replay: a second call finds the payment paid and the booking confirmed.
+        Raises Payment.DoesNotExist for an unknown order. See settle() for
+        payments that can't confirm their booking.
+        """
+        with transaction.atomic():
+            payment = cls.objects.select_for_update().get(order_id=order_id)
+            payment.status = "paid"
+            payment.payment_id = payment_id or payment.payment_id
+            payment.signature = signature or payment.signature
+            if payment.booking_id is None and booking_id:
+                payment.booking_id = booking_id
+            payment.save(update_fields=["status", "payment_id", "signature", "booking"])
+            cls.settle([payment])
+        return payment
+
+    @classmethod
+    def settle(cls, payments):
+        """
+        Confirm the bookings of paid payments, in bulk. The booking must still
+        be active and the payment must come from its owner and cover its
+        total exactly. Otherwise, and when the hold was released or the
+        booking cancelled before the money arrived, the payment moves to
+        refund_due and the booking is left alone. Must run in a transaction.
+        """
+        paid = [payment for payment in payments if payment.status == "paid" and payment.booking_id]
+        if not paid:
+            return
+        bookings = Booking.objects.filter(pk__in={payment.booking_id for payment in paid}).with_total_price().in_bulk()
+        payable = [
+            payment for payment in paid
+            if cls.payable_error(bookings.get(payment.booking_id), payment.user_id, payment.amount) is None
+        ]
+        Booking.confirm_paid([payment.booking_id for payment in payable])
+        confirmed = set(
+            Booking.objects.filter(
+                pk__in=[payment.booking_id for payment in payable], status=Booking.STATUS_CONFIRMED
+            ).values_list("pk", flat=True)
+        )
+        refunds = [payment for payment in paid if payment.booking_id not in confirmed or payment not in payable]
+        for payment in refunds:
+            payment.status = "refund_due"
+        cls.objects.filter(pk__in=[payment.pk for payment in refunds]).update(status="refund_due")
+
+
+class WebhookEvent(models.Model):
+    """
+    Gateway webhook as received: stored right after its signature is checked
+    and applied later, in batches, by `manage.py process_webhooks`. The
+    gateway's event id is unique, so redelivered events are stored once.
+    """
+    event_id = models.CharField(max_length=64, unique=True)
+    event = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker's queue: unprocessed events in arrival order
+            models.Index(fields=['processed_at', 'id'], name='webhook_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} ({self.event_id})"
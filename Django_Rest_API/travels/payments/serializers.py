@@ -0,0 +1,13 @@
+# travels/payments/serializers.py
+from decimal import Decimal
+
+from rest_framework import serializers
+
+
+class CreateOrderSerializer(serializers.Serializer):
+    """
+    Body of POST /api/payments/create-order/. DecimalField only accepts
+    finite numbers, so "Infinity" or "NaN" are rejected like any other bad amount.
+    """
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal("0.01"))
+    booking_id = serializers.IntegerField(required=False, allow_null=True, min_value=1)
@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import socket
+import threading
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.models import Booking, BookingSeat, Bus, SeatOccupancy
+from payments import fake_gateway, webhooks
+from payments.gateway import GatewayError, RazorpayGateway
+from payments.models import Payment, WebhookEvent
+
+FAST_RETRIES = {'PAYMENT_GATEWAY_RETRIES': 2, 'PAYMENT_GATEWAY_BACKOFF': 0.01}
+
+
+class GatewayClientTests(SimpleTestCase):
+    """
+    RazorpayGateway against payments/fake_gateway.py: which failures are
+    retried, and reuse of the pooled async client.
+    """
+
+    def start_fake_gateway(self, **options):
+        server = fake_gateway.make_server(**options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, f'http://127.0.0.1:{server.server_port}/v1'
+
+    def gateway(self, url, **settings):
+        with override_settings(PAYMENT_GATEWAY_URL=url, **FAST_RETRIES, **settings):
+            return RazorpayGateway()
+
+    def test_order_creation_is_not_retried_after_a_5xx(self):
+        server, url = self.start_fake_gateway(failure_rate=1.0)
+        gateway = self.gateway(url)
+
+        with self.assertRaisesMessage(GatewayError, 'HTTP 503'):
+            gateway.create_order(100)
+        with self.assertRaisesMessage(GatewayError, 'HTTP 503'):
+            asyncio.run(gateway.acreate_order(100))
+        self.assertEqual(server.requests_received, 2)
+
+    def test_order_creation_is_not_retried_after_a_read_timeout(self):
+        server, url = self.start_fake_gateway(latency=0.5)
+        gateway = self.gateway(url, PAYMENT_GATEWAY_TIMEOUT=0.1)
+
+        with self.assertRaisesMessage(GatewayError, 'ReadTimeout'):
+            asyncio.run(gateway.acreate_order(100))
+        self.assertEqual(server.requests_received, 1)
+
+    def test_connection_errors_are_retried(self):
+        # a port nothing listens on: the request never reached the gateway
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        gateway = self.gateway(f'http://127.0.0.1:{port}/v1')
+
+        with self.assertLogs('payments.gateway', 'WARNING') as logs:
+            with self.assertRaisesMessage(GatewayError, 'ConnectError'):
+                asyncio.run(gateway.acreate_order(100))
+        self.assertEqual(len(logs.records), FAST_RETRIES['PAYMENT_GATEWAY_RETRIES'])
+
+    def test_async_client_is_reused_on_a_loop(self):
+        server, url = self.start_fake_gateway()
+        gateway = self.gateway(url)
+
+        async def two_orders():
+            first = await gateway.acreate_order(100)
+            client = gateway._async_client()
+            second = await gateway.acreate_order(200)
+            self.assertIs(gateway._async_client(), client)
+            await gateway.aclose()
+            self.assertTrue(client.is_closed)
+            return first, second
+
+        first, second = asyncio.run(two_orders())
+        self.assertEqual((first['amount'], second['amount']), (100, 200))
+        self.assertEqual(server.orders_created, 2)
+
+
+def payment_signature(order_id, payment_id):
+    message = f"{order_id}|{payment_id}".encode('utf-8')
+    return hmac.new(settings.RAZORPAY_KEY_SECRET.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+class PaymentTestCase(TestCase):
+    JOURNEY_DATE = '2030-01-01'
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+        self.bus = Bus.objects.create(
+            bus_name='Paid', number='PY-1', origin='Delhi', destination='Agra',
+            start_time='10:00', reach_time='12:00', no_of_seats=4, price=250,
+        )
+        self.seat = self.bus.seats.first()
+
+    def book(self, user, hold=True):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/booking/', {
+            'bus': self.bus.id, 'seats': [self.seat.id], 'journey_date': self.JOURNEY_DATE, 'hold': hold,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Booking.objects.get(pk=response.data['id'])
+
+    def order(self, user, booking=None, amount=250):
+        return Payment.objects.create(
+            order_id=f'order_{Payment.objects.count() + 1}', amount=amount, user=user, booking=booking,
+        )
+
+    def verify(self, payment, booking_id=None):
+        payment_id = f'pay_{payment.order_id}'
+        return APIClient().post('/api/payments/verify/', {
+            'razorpay_order_id': payment.order_id,
+            'razorpay_payment_id': payment_id,
+            'razorpay_signature': payment_signature(payment.order_id, payment_id),
+            'booking_id': booking_id,
+        }, format='json')
+
+
+class PaymentVerificationTests(PaymentTestCase):
+    """
+    Verifying a payment confirms its held booking only when the owner paid
+    its exact total; anything else is kept for a refund.
+    """
+
+    def test_paid_hold_is_confirmed_and_replays_change_nothing(self):
+        booking = self.book(self.owner)
+        payment = self.order(self.owner, booking)
+
+        response = self.verify(payment)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'status': 'verified', 'booking_status': 'confirmed'})
+        self.assertEqual(BookingSeat.objects.get(booking=booking).status, Booking.STATUS_CONFIRMED)
+        version = SeatOccupancy.objects.get(bus=self.bus, journey_date=self.JOURNEY_DATE).version
+
+        response = self.verify(payment)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'status': 'verified', 'booking_status': 'confirmed'})
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'paid')
+        self.assertEqual(SeatOccupancy.objects.get(bus=self.bus, journey_date=self.JOURNEY_DATE).version, version)
+
+    def test_payment_from_another_user_is_refunded(self):
+        booking = self.book(self.owner)
+        # an order created without a booking, then pointed at someone else's at verify time
+        payment = self.order(self.other)
+
+        response = self.verify(payment, booking_id=booking.id)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], 'refund_due')
+        payment.refresh_from_db()
+        booking.refresh_from_db()
+        self.assertEqual(payment.status, 'refund_due')
+        self.assertEqual(booking.status, Booking.STATUS_PENDING)
+
+    def test_mismatched_amount_is_refunded(self):
+        booking = self.book(self.owner)
+        payment = self.order(self.owner, booking, amount=1)
+
+        response = self.verify(payment)
+        self.assertEqual(response.status_code, 409)
+        payment.refresh_from_db()
+        booking.refresh_from_db()
+        self.assertEqual(payment.status, 'refund_due')
+        self.assertEqual(booking.status, Booking.STATUS_PENDING)
+
+    def test_paying_an_expired_hold_whose_seat_was_taken(self):
+        held = self.book(self.owner)
+        payment = self.order(self.owner, held)
+        past = timezone.now() - timedelta(minutes=1)
+        Booking.objects.filter(pk=held.pk).update(hold_expires_at=past)
+        BookingSeat.objects.filter(booking=held).update(hold_expires_at=past)
+        # the hold ran out: the next booking of the seat releases it and takes the seat
+        taken = self.book(self.other, hold=False)
+
+        response = self.verify(payment)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['booking_status'], Booking.STATUS_CANCELLED)
+        payment.refresh_from_db()
+        taken.refresh_from_db()
+        self.assertEqual(payment.status, 'refund_due')
+        self.assertEqual(taken.status, Booking.STATUS_CONFIRMED)
+        active = BookingSeat.objects.filter(seat=self.seat, status__in=BookingSeat.ACTIVE_STATUSES)
+        self.assertEqual(list(active.values_list('booking', flat=True)), [taken.pk])
+
+
+def webhook_event(event, order_id, payment_id='pay_1'):
+    if event == 'order.paid':
+        return {'event': event, 'payload': {'order': {'entity': {'id': order_id}}}}
+    return {'event': event, 'payload': {'payment': {'entity': {'id': payment_id, 'order_id': order_id}}}}
+
+
+class WebhookTests(PaymentTestCase):
+    """
+    Webhooks are stored once per event id after their signature is checked,
+    and applied by the worker without ever undoing a payment.
+    """
+
+    def post_webhook(self, data, event_id=None, secret=None):
+        body = json.dumps(data).encode('utf-8')
+        secret = secret or settings.RAZORPAY_WEBHOOK_SECRET
+        headers = {'HTTP_X_RAZORPAY_SIGNATURE': hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()}
+        if event_id:
+            headers['HTTP_X_RAZORPAY_EVENT_ID'] = event_id
+        return self.client.post('/api/payments/webhook/', body, content_type='application/json', **headers)
+
+    def test_bad_signature_is_rejected(self):
+        payment = self.order(self.owner)
+        response = self.post_webhook(webhook_event('payment.captured', payment.order_id), secret='wrong')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_redelivered_event_is_stored_and_applied_once(self):
+        booking = self.book(self.owner)
+        payment = self.order(self.owner, booking)
+        data = webhook_event('payment.captured', payment.order_id)
+        for _ in range(2):
+            self.assertEqual(self.post_webhook(data, event_id='evt_1').status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+        self.assertEqual(webhooks.apply_pending(), 1)
+        self.assertEqual(webhooks.apply_pending(), 0)
+        payment.refresh_from_db()
+        booking.refresh_from_db()
+        self.assertEqual(payment.status, 'paid')
+        self.assertEqual(booking.status, Booking.STATUS_CONFIRMED)
+
+    def test_failure_reported_after_payment_is_ignored(self):
+        booking = self.book(self.owner)
+        payment = self.order(self.owner, booking)
+        # in one batch, and in a later batch
+        self.post_webhook(webhook_event('order.paid', payment.order_id), event_id='evt_1')
+        self.post_webhook(webhook_event('payment.failed', payment.order_id, 'pay_0'), event_id='evt_2')
+        webhooks.apply_pending()
+        self.post_webhook(webhook_event('payment.failed', payment.order_id, 'pay_2'), event_id='evt_3')
+        webhooks.apply_pending()
+
+        payment.refresh_from_db()
+        booking.refresh_from_db()
+        self.assertEqual(payment.status, 'paid')
+        self.assertEqual(booking.status, Booking.STATUS_CONFIRMED)
+        self.assertFalse(WebhookEvent.objects.filter(processed_at__isnull=True).exists())
+
+
+class WebhookWorkerTests(TransactionTestCase):
+    """
+    Several workers draining the queue at once claim every event exactly once.
+    """
+    WORKERS = 4
+    EVENTS = 40
+
+    def test_workers_claim_each_event_once(self):
+        payments = Payment.objects.bulk_create(
+            [Payment(order_id=f'order_{index}', amount=100) for index in range(self.EVENTS)]
+        )
+        WebhookEvent.objects.bulk_create([
+            WebhookEvent(event_id=f'evt_{index}', **webhook_event('order.paid', payment.order_id))
+            for index, payment in enumerate(payments)
+        ])
+        claimed, lock = Counter(), threading.Lock()
+        change = webhooks._change
+
+        def counted_change(event):
+            with lock:
+                claimed[event.event_id] += 1
+            return change(event)
+
+        start = threading.Barrier(self.WORKERS)
+
+        def worker():
+            try:
+                start.wait()
+                while webhooks.apply_pending(batch_size=5):
+                    pass
+            finally:
+                connection.close()
+
+        with mock.patch.object(webhooks, '_change', counted_change):
+            threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(claimed), self.EVENTS)
+        self.assertEqual(set(claimed.values()), {1})
+        self.assertEqual(Payment.objects.filter(status='paid').count(), self.EVENTS)
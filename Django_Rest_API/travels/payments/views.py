@@ -1,64 +1,85 @@
 import json
 import uuid
-import razorpay
-from decimal import Decimal
 from django.conf import settings
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from bookings.authentication import aget_token_user
+from bookings.models import Booking
+from . import webhooks
+from .gateway import GatewayError, SignatureError, get_gateway
 from .models import Payment
+from .serializers import CreateOrderSerializer
 
-# Initialize Razorpay client once
-razorpay_client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
 
-@api_view(["POST"])
-@permission_classes([AllowAny])  # later: change to IsAuthenticated if needed
-def create_order(request):
+def _booking_id(value):
     try:
-        # Fix: Handle decimal amounts properly
-        amount_str = request.data.get("amount", 0)
-        
-        # Convert to float first, then to int (for paise conversion)
-        if isinstance(amount_str, str):
-            amount = int(float(amount_str) * 100)  # Convert to paise
-        else:
-            amount = int(float(amount_str) * 100)  # Convert to paise
-        
-        currency = "INR"
-
-        if amount <= 0:
-            return Response({"error": "Invalid amount"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Fix: Use the initialized client instead of creating a new one with hardcoded keys
-        order = razorpay_client.order.create({
-            'amount': amount,
-            'currency': currency,
-            'payment_capture': '1'  # Auto capture
-        })
-
-        # DB me save karna
-        payment = Payment.objects.create(
-            order_id=order["id"],
-            amount=amount // 100,  # Store original amount in rupees
-            currency=currency,
-            status="created",
-        )
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
 
-        return Response({
-            "orderId": order["id"],  # Match frontend expectation
-            "key": settings.RAZORPAY_KEY_ID,  # Add key for frontend
-            "amount": amount,
-            "currency": currency,
-            "status": "created"
-        })
 
-    except Exception as e:
-        print(f"Error creating order: {str(e)}")  # For debugging
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+@csrf_exempt
+async def create_order(request):
+    """
+    Async so a slow gateway round trip waits on the event loop instead of
+    holding a worker thread. Body: {"amount": "<rupees>", ...} as JSON or form data.
+    A booking_id ties the order to one of the (token-authenticated) user's
+    bookings, and the amount must then be that booking's total.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": f'Method "{request.method}" not allowed.'}, status=405)
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        data = request.POST
+    # rejects non-object bodies and non-finite, non-positive or over-precise amounts
+    serializer = CreateOrderSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    # Decimal, not float: 19.99 * 100 must be 1999 paise, not 1998
+    amount = int(serializer.validated_data["amount"] * 100)  # Convert to paise
+
+    currency = "INR"
+    user = await aget_token_user(request)
+    booking_id = serializer.validated_data.get("booking_id")
+    if booking_id:
+        # only the owner can pay for a booking, and only its exact total
+        booking = await Booking.objects.filter(pk=booking_id).with_total_price().afirst()
+        error = Payment.payable_error(booking, user and user.id, serializer.validated_data["amount"])
+        if error:
+            return JsonResponse({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # the receipt ties gateway-side retries of this call back to one request
+        order = await get_gateway().acreate_order(amount, currency, receipt=f"rcpt_{uuid.uuid4().hex[:20]}")
+    except GatewayError as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+
+    # DB me save karna
+    await Payment.objects.acreate(
+        order_id=order["id"],
+        amount=serializer.validated_data["amount"],  # Store original amount in rupees
+        currency=currency,
+        status="created",
+        receipt=order.get("receipt"),
+        user=user,
+        booking_id=booking_id,
+    )
+
+    return JsonResponse({
+        "orderId": order["id"],  # Match frontend expectation
+        "key": settings.RAZORPAY_KEY_ID,  # Add key for frontend
+        "amount": amount,
+        "currency": currency,
+        "status": "created"
+    })
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
@@ -80,44 +101,47 @@ def verify_payment(request):
         }
 
         # Verify signature
-        razorpay_client.utility.verify_payment_signature(payload)
-
-        # Update Payment record
-        payment = Payment.objects.filter(order_id=payload["razorpay_order_id"]).first()
-        if payment:
-            payment.payment_id = payload["razorpay_payment_id"]
-            payment.signature = payload["razorpay_signature"]
-            payment.status = "paid"
-            payment.save()
-
-            # If booking_id is provided, update the booking status
-            booking_id = request.data.get("booking_id")
-            if booking_id:
-                try:
-                    from bookings.models import Booking  # Adjust import as per your app structure
-                    booking = Booking.objects.get(id=booking_id)
-                    booking.payment_status = 'paid'  # or whatever field you use
-                    booking.status = 'confirmed'  # Update booking status
-                    booking.save()
-                except Booking.DoesNotExist:
-                    print(f"Booking {booking_id} not found")
-                except Exception as booking_error:
-                    print(f"Error updating booking: {str(booking_error)}")
-
-        return Response({"status": "verified"}, status=200)
-
-    except razorpay.errors.SignatureVerificationError:
+        get_gateway().verify_payment_signature(
+            payload["razorpay_order_id"], payload["razorpay_payment_id"], payload["razorpay_signature"]
+        )
+
+        # Mark paid and confirm the held booking in one transaction; replays are no-ops
+        booking_id = _booking_id(request.data.get("booking_id"))
+        if booking_id and not Booking.objects.filter(pk=booking_id).exists():
+            booking_id = None
+        try:
+            payment = Payment.confirm(
+                payload["razorpay_order_id"],
+                payment_id=payload["razorpay_payment_id"],
+                signature=payload["razorpay_signature"],
+                booking_id=booking_id,
+            )
+        except Payment.DoesNotExist:
+            return Response({"status": "failed", "error": "Unknown order"}, status=404)
+
+        booking_status = None
+        if payment.booking_id:
+            booking_status = Booking.objects.filter(pk=payment.booking_id).values_list("status", flat=True).first()
+        if payment.status == "refund_due":
+            return Response({
+                "status": "refund_due",
+                "booking_status": booking_status,
+                "error": "The booking could not be confirmed with this payment; it will be refunded",
+            }, status=409)
+        return Response({"status": "verified", "booking_status": booking_status}, status=200)
+
+    except SignatureError:
         # Mark as failed
         oid = request.data.get("razorpay_order_id")
         if oid:
-            Payment.objects.filter(order_id=oid).update(status="failed")
+            Payment.objects.filter(order_id=oid).exclude(status="paid").update(status="failed")
         return Response({"status": "failed", "error": "Invalid signature"}, status=400)
     
     except Exception as e:
         # Mark as failed
         oid = request.data.get("razorpay_order_id")
         if oid:
-            Payment.objects.filter(order_id=oid).update(status="failed")
+            Payment.objects.filter(order_id=oid).exclude(status="paid").update(status="failed")
         print(f"Payment verification error: {str(e)}")  # For debugging
         return Response({"status": "failed", "error": str(e)}, status=400)
 
@@ -126,48 +150,24 @@ def razorpay_webhook(request):
     """
     Set Webhook URL in Razorpay dashboard to /api/payments/webhook/
     and use secret = RAZORPAY_WEBHOOK_SECRET
-    """
-    try:
-        body = request.body.decode("utf-8")
-        signature = request.headers.get("X-Razorpay-Signature", "")
 
-        # Verify webhook signature
-        razorpay_client.utility.verify_webhook_signature(
-            body, signature, settings.RAZORPAY_WEBHOOK_SECRET
-        )
+    Events are only verified and stored here; `manage.py process_webhooks`
+    applies them, so the gateway gets its 200 without waiting on our updates.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": f'Method "{request.method}" not allowed.'}, status=405)
 
-        data = json.loads(body)
-        event = data.get("event")
-        payload = data.get("payload", {})
-        
-        # Handle different event structures
-        if event == "payment.captured":
-            payment_entity = payload.get("payment", {}).get("entity", {})
-            order_id = payment_entity.get("order_id")
-            payment_id = payment_entity.get("id")
-            
-            if order_id:
-                Payment.objects.filter(order_id=order_id).update(
-                    status="paid",
-                    payment_id=payment_id
-                )
-                
-        elif event == "payment.failed":
-            payment_entity = payload.get("payment", {}).get("entity", {})
-            order_id = payment_entity.get("order_id")
-            
-            if order_id:
-                Payment.objects.filter(order_id=order_id).update(status="failed")
-                
-        elif event == "order.paid":
-            order_entity = payload.get("order", {}).get("entity", {})
-            order_id = order_entity.get("id")
-            
-            if order_id:
-                Payment.objects.filter(order_id=order_id).update(status="paid")
-
-        return Response({"ok": True}, status=200)
+    try:
+        get_gateway().verify_webhook_signature(request.body, request.headers.get("X-Razorpay-Signature", ""))
+    except SignatureError:
+        return JsonResponse({"error": "Invalid signature"}, status=400)
 
-    except Exception as e:
-        print(f"Webhook error: {str(e)}")  # For debugging
-        return Response({"error": str(e)}, status=400)
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data.get("event"), str):
+            raise ValueError
+    except (ValueError, AttributeError):
+        return JsonResponse({"error": "Invalid payload"}, status=400)
+
+    webhooks.record(request.body, data, event_id=request.headers.get("X-Razorpay-Event-Id"))
+    return JsonResponse({"ok": True})
@@ -0,0 +1,92 @@
+# travels/payments/webhooks.py
+import hashlib
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Payment, WebhookEvent
+
+# payment status each event moves its order to
+EVENT_STATUS = {
+    "payment.captured": "paid",
+    "order.paid": "paid",
+    "payment.failed": "failed",
+}
+
+
+def record(body, data, event_id=None):
+    """
+    Store a verified webhook for the worker. The gateway's event id (or a
+    hash of the body when it has none) is unique, so redeliveries are no-ops.
+    """
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(
+            event_id=event_id or hashlib.sha256(body).hexdigest(),
+            event=data["event"],
+            payload=data.get("payload") if isinstance(data.get("payload"), dict) else {},
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def _change(event):
+    """
+    (order_id, status, payment_id) an event asks for, or None for events we don't act on.
+    """
+    status = EVENT_STATUS.get(event.event)
+    if status is None:
+        return None
+    if event.event == "order.paid":
+        order_id = event.payload.get("order", {}).get("entity", {}).get("id")
+        payment_id = None
+    else:
+        entity = event.payload.get("payment", {}).get("entity", {})
+        order_id, payment_id = entity.get("order_id"), entity.get("id")
+    return (order_id, status, payment_id) if order_id else None
+
+
+def apply_pending(batch_size=500):
+    """
+    Apply one batch of unprocessed events in arrival order (payments updated,
+    paid bookings confirmed) and mark them processed, all in one transaction. Returns the number of events handled.
+
+    Rows are claimed with SKIP LOCKED so several workers can share the queue.
+    A paid (or refund_due) order never goes back to failed (a failed attempt can be reported
+    after a successful one), so applying an event twice changes nothing.
+    """
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        changes = [(event, _change(event)) for event in events]
+        payments = Payment.objects.in_bulk(
+            {change[0] for _, change in changes if change}, field_name="order_id"
+        )
+        updated, unknown = {}, []
+        for event, change in changes:
+            if change is None:
+                continue
+            order_id, status, payment_id = change
+            payment = payments.get(order_id)
+            if payment is None:
+                unknown.append(event.pk)
+                continue
+            if payment.status in ("paid", "refund_due") and status == "failed":
+                continue
+            payment.status = status
+            payment.payment_id = payment_id or payment.payment_id
+            updated[payment.pk] = payment
+        Payment.objects.bulk_update(updated.values(), ["status", "payment_id"])
+        # same step as Payment.confirm(): paid orders confirm their held bookings
+        Payment.settle(updated.values())
+
+        now = timezone.now()
+        WebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=now)
+        if unknown:
+            WebhookEvent.objects.filter(pk__in=unknown).update(error="Unknown order")
+    return len(events)
@@ -2,6 +2,8 @@
 ASGI config for travels project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Long-lived responses (the seat-map event stream) need this entry point;
+under WSGI each open stream would pin a worker thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,28 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'travels.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from payments.gateway import get_gateway  # noqa: E402 (needs the app registry set up above)
+
+
+async def lifespan(receive, send):
+    """
+    ASGI lifespan events (Django itself doesn't handle them): close the
+    payment gateway's pooled connections when the worker shuts down.
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await get_gateway().aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -1,4 +1,5 @@
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -35,7 +36,7 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'bookings.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         "rest_framework.permissions.AllowAny",
@@ -69,6 +70,61 @@ RAZORPAY_KEY_ID = "rzp_test_RA24xW8Uccu5lr"
 RAZORPAY_KEY_SECRET = "Gsd19GWrJOlPgyIErxMcrrCp"
 RAZORPAY_WEBHOOK_SECRET = "whsec_test_123" 
 
+# Payment gateway client (payments/gateway.py). For local runs and benchmarks,
+# start payments/fake_gateway.py and point PAYMENT_GATEWAY_URL at it.
+PAYMENT_GATEWAY = 'payments.gateway.RazorpayGateway'
+PAYMENT_GATEWAY_URL = os.environ.get('PAYMENT_GATEWAY_URL', 'https://api.razorpay.com/v1')
+PAYMENT_GATEWAY_CONNECT_TIMEOUT = 2  # seconds
+PAYMENT_GATEWAY_TIMEOUT = 5  # seconds per attempt (read/write/pool)
+PAYMENT_GATEWAY_RETRIES = 2  # extra attempts on timeouts, connection errors, 429 and 5xx (POSTs: connect errors and 429 only)
+PAYMENT_GATEWAY_BACKOFF = 0.25  # seconds, doubled per retry plus jitter
+PAYMENT_GATEWAY_MAX_CONNECTIONS = 20  # pooled keep-alive connections per worker
+
+# How long a pending booking holds its seats during checkout
+SEAT_HOLD_SECONDS = 10 * 60
+
+# Most bookings one POST /api/bookings/batch/ request may create
+BOOKING_BATCH_MAX_ITEMS = 50
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Cache: in-process by default, Redis when REDIS_URL is set (shared across workers)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+
+# Live seat-map events (SSE): in-process pub/sub for a single worker, Redis pub/sub across workers
+SEAT_EVENTS_BROKER = (
+    'bookings.events.RedisBroker' if REDIS_URL else 'bookings.events.InProcessBroker'
+)
+
+# Token auth (bookings/authentication.py): lookups are cached for
+# AUTH_TOKEN_CACHE_SECONDS, in the shared cache when Redis is configured (so
+# logout takes effect in every worker) and per worker otherwise, and tokens
+# older than AUTH_TOKEN_TTL seconds are rejected (None: never expire).
+AUTH_TOKEN_TTL = 30 * 24 * 60 * 60
+AUTH_TOKEN_CACHE_SECONDS = 60
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_SHARED_CACHE = bool(REDIS_URL)
+# Lifetime of the signed tickets that authenticate seat-event streams (EventSource can't send headers)
+STREAM_TICKET_SECONDS = 60
+
+# Upper bound on how long a cached bus search lives (booking writes invalidate it sooner)
+BUS_SEARCH_CACHE_SECONDS = 60
+
+# Route planner (GET /api/routes/): default minimum time between connecting legs
+# (overridable per query), longest wait allowed between legs, and most legs per itinerary
+ROUTE_MIN_TRANSFER_MINUTES = 30
+ROUTE_MAX_TRANSFER_MINUTES = 12 * 60
+ROUTE_MAX_LEGS = 3
+
 ROOT_URLCONF = 'travels.urls'
 
 TEMPLATES = [
@@ -96,6 +152,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLite has no row locks (select_for_update is a no-op): IMMEDIATE makes
+        # each transaction take the write lock when it starts, so concurrent
+        # bookings queue up instead of failing with "database is locked"
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        # a file, not the in-memory default, so threaded tests get real connections
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
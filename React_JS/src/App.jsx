@@ -1,4 +1,5 @@
 import React, { useState, useEffect, useCallback } from 'react';
+import axios from 'axios';
 import { Routes, Route } from 'react-router-dom';
 import RegisterForm from './deepcomponents/RegisterForm';
 import LoginForm from './deepcomponents/LoginForm';
@@ -61,6 +62,14 @@ const App = () => {
   // Logout handler
   const handleLogout = () => {
     try {
+      // revoke the token server-side; the local session is cleared either way
+      if (token) {
+        axios.post(
+          `${import.meta.env.VITE_API_BASE_URL}/logout/`,
+          {},
+          { headers: { Authorization: `Token ${token}` } }
+        ).catch((error) => console.error('Logout request failed:', error));
+      }
       localStorage.removeItem('token');
       localStorage.removeItem('userId');
       localStorage.removeItem('username');
@@ -16,6 +16,14 @@ const BusList = ({ token }) => {
   const [filterDestination, setFilterDestination] = useState('');
   const navigate = useNavigate();
 
+  const [nextUrl, setNextUrl] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  // /buses/ is cursor-paginated: load the first page, then one more per "Load more"
+  const fetchPage = (url) => axios.get(url, {
+    headers: { 'Authorization': `Token ${token}` }
+  });
+
   useEffect(() => {
     if (!token) return navigate('/login');
     let isMounted = true;
@@ -24,10 +32,16 @@ const BusList = ({ token }) => {
       try {
         setIsLoading(true);
         setError(null);
-        const response = await axios.get(`${import.meta.env.VITE_API_BASE_URL}/buses/`, {
-          headers: { 'Authorization': `Token ${token}` }
-        });
-        if (isMounted) setBuses(response.data);
+        // origin/destination are filtered by the server, so they cover unloaded pages too
+        const params = new URLSearchParams({ page_size: '30' });
+        if (filterOrigin || filterDestination) params.set('match', 'exact');
+        if (filterOrigin) params.set('departure', filterOrigin);
+        if (filterDestination) params.set('destination', filterDestination);
+        const response = await fetchPage(`${import.meta.env.VITE_API_BASE_URL}/buses/?${params}`);
+        if (isMounted) {
+          setBuses(response.data.results);
+          setNextUrl(response.data.next);
+        }
       } catch (err) {
         console.error(err);
         if (isMounted) {
@@ -40,7 +54,22 @@ const BusList = ({ token }) => {
     };
     fetchBuses();
     return () => { isMounted = false; };
-  }, [token, navigate]);
+  }, [token, navigate, filterOrigin, filterDestination]);
+
+  const loadMore = async () => {
+    if (!nextUrl || isLoadingMore) return;
+    try {
+      setIsLoadingMore(true);
+      const response = await fetchPage(nextUrl);
+      setBuses(prev => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next);
+    } catch (err) {
+      console.error(err);
+      toast.error('Failed to load more buses');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
 
   const filteredBuses = buses.filter(bus => {
     const matchesSearch = bus.bus_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
@@ -50,8 +79,9 @@ const BusList = ({ token }) => {
     return matchesSearch && matchesOrigin && matchesDestination;
   });
 
-  const uniqueOrigins = [...new Set(buses.map(bus => bus.origin))];
-  const uniqueDestinations = [...new Set(buses.map(bus => bus.destination))];
+  // built from the loaded pages; the selected value stays listed after the server filters
+  const uniqueOrigins = [...new Set([filterOrigin, ...buses.map(bus => bus.origin)].filter(Boolean))];
+  const uniqueDestinations = [...new Set([filterDestination, ...buses.map(bus => bus.destination)].filter(Boolean))];
 
   if (isLoading) return <div className={`flex justify-center items-center min-h-[400px] ${isDark ? 'text-gray-200' : 'text-gray-800'}`}><div className="animate-spin rounded-full h-12 w-12 border-t-2 border-b-2 border-indigo-500" /></div>;
   if (error) return <div className="p-4 max-w-4xl mx-auto text-center">{error}</div>;
@@ -79,6 +109,17 @@ const BusList = ({ token }) => {
           {filteredBuses.map(bus => <BusCard key={bus.id} bus={bus} isDark={isDark} token={token} />)}
         </div>
       )}
+      {nextUrl && (
+        <div className="flex justify-center mt-8">
+          <button
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className={`py-2 px-6 rounded font-medium transition-colors duration-200 disabled:opacity-50 ${isDark ? 'bg-gray-700 hover:bg-gray-600 text-gray-200' : 'bg-gray-200 hover:bg-gray-300 text-gray-800'}`}
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more buses'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -46,29 +46,52 @@ const BusSeats = ({ token, isDark }) => {
     fetchBus();
   }, [busId, token]);
 
-  // Refresh seats periodically
-  const fetchUpdatedSeats = async () => {
-    if (!journeyDate) return;
-    try {
-      const response = await axios.get(
-        `${import.meta.env.VITE_API_BASE_URL}/buses/${busId}/`,
-        { 
-          headers: { Authorization: `Token ${token}` },
-          params: { journey_date: journeyDate }
-        }
-      );
-      setBus(response.data);
-      setSeats(response.data.seats || []);
-    } catch (err) {
-      console.error(err);
-      toast.error('Failed to refresh seat data');
-    }
-  };
-
+  // Live seat updates: the server pushes the seat state whenever a booking,
+  // hold or cancellation touches this bus on the selected date
   useEffect(() => {
-    const intervalId = setInterval(fetchUpdatedSeats, 30000);
-    return () => clearInterval(intervalId);
-  }, [busId, journeyDate]);
+    if (!journeyDate || !token) return;
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+
+    // EventSource can't send the Authorization header, so each connection
+    // opens with a short-lived ticket instead of the token in the URL
+    const connect = async () => {
+      try {
+        const { data } = await axios.post(
+          `${import.meta.env.VITE_API_BASE_URL}/buses/${busId}/seat-events/ticket/`,
+          {},
+          { headers: { Authorization: `Token ${token}` } }
+        );
+        if (closed) return;
+        source = new EventSource(
+          `${import.meta.env.VITE_API_BASE_URL}/buses/${busId}/seat-events/?journey_date=${journeyDate}&ticket=${encodeURIComponent(data.ticket)}`
+        );
+      } catch (err) {
+        console.error(err);
+        if (!closed) retryTimer = setTimeout(connect, 5000);
+        return;
+      }
+      source.addEventListener('seats', (event) => {
+        const { booked, held } = JSON.parse(event.data);
+        const taken = new Set([...booked, ...held]);
+        setSeats((prev) => prev.map((seat) => ({ ...seat, is_booked: taken.has(seat.id) })));
+        setSelectedSeats((prev) => prev.filter((seat) => !taken.has(seat.id)));
+      });
+      // the browser's own reconnect would reuse the (expired) ticket: reconnect with a new one
+      source.onerror = () => {
+        source.close();
+        if (!closed) retryTimer = setTimeout(connect, 3000);
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, [busId, journeyDate, token]);
 
   // Handle journey date change
   const onJourneyDateChange = (date) => {
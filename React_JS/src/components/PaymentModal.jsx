@@ -4,7 +4,7 @@ import axios from 'axios';
 import { toast } from 'react-toastify';
 import { loadRazorpay } from '../utils/loadRazorpay';
 
-const PaymentModal = ({ isOpen, onClose, amount, bookingId, seats, fetchBookings, fetchBookingStats, isDark }) => {
+const PaymentModal = ({ isOpen, onClose, amount, bookingId, seats, fetchBookings, fetchBookingStats, isDark, token }) => {
   if (!isOpen) return null;
 
   const handlePayment = async () => {
@@ -17,6 +17,8 @@ const PaymentModal = ({ isOpen, onClose, amount, bookingId, seats, fetchBookings
         amount,
         booking_id: bookingId,
         seats, // send array of seat IDs
+      }, {
+        headers: { Authorization: `Token ${token}` }, // orders for a booking must come from its owner
       });
 
       const options = {
@@ -23,18 +23,31 @@ const UserBookings = ({ token, userId }) => {
   });
   const [confirmDialog, setConfirmDialog] = useState({ isOpen: false, bookingId: null });
 
-  // ✅ Fetch combined stats + bookings
-  const fetchBookingStats = async () => {
+  const [nextUrl, setNextUrl] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  const fetchPage = async (url) => {
+    const res = await fetch(url, { headers: { Authorization: `Token ${token}` } });
+    const data = await res.json();
+    if (!res.ok) throw new Error(data.error || 'Failed to fetch stats');
+    return data;
+  };
+
+  // ✅ Fetch combined stats + the first page of bookings (newest first)
+  const fetchBookingStats = async ({ initial = false } = {}) => {
     try {
-      const res = await fetch(
-        `${import.meta.env.VITE_API_BASE_URL}/user/${userId}/booking-stats/`,
-        { headers: { Authorization: `Token ${token}` } }
+      const data = await fetchPage(
+        `${import.meta.env.VITE_API_BASE_URL}/user/${userId}/booking-stats/?include=bookings`
       );
-      const data = await res.json();
-      if (!res.ok) throw new Error(data.error || 'Failed to fetch stats');
-
       setBookingStats(data.stats);
-      setBookings(data.bookings);
+      if (initial) {
+        setBookings(data.bookings);
+        setNextUrl(data.next);
+      } else {
+        // refresh the first page; older pages loaded with "Load more" stay in the list
+        const fresh = new Set(data.bookings.map((b) => b.id));
+        setBookings((prev) => [...data.bookings, ...prev.filter((b) => !fresh.has(b.id))]);
+      }
       setError(null);
     } catch (err) {
       console.error(err);
@@ -42,11 +55,30 @@ const UserBookings = ({ token, userId }) => {
     }
   };
 
+  // /booking-stats/?include=bookings is cursor-paginated: one more page per "Load more"
+  const loadMore = async () => {
+    if (!nextUrl || isLoadingMore) return;
+    try {
+      setIsLoadingMore(true);
+      const data = await fetchPage(nextUrl);
+      setBookings((prev) => {
+        const loaded = new Set(prev.map((b) => b.id));
+        return [...prev, ...data.bookings.filter((b) => !loaded.has(b.id))];
+      });
+      setNextUrl(data.next);
+    } catch (err) {
+      console.error(err);
+      toast.error('Failed to load more bookings');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     const fetchData = async () => {
       setLoading(true);
       try {
-        if (token && userId) await fetchBookingStats();
+        if (token && userId) await fetchBookingStats({ initial: true });
       } finally {
         setLoading(false);
       }
@@ -63,6 +95,10 @@ const UserBookings = ({ token, userId }) => {
         { headers: { Authorization: `Token ${token}` } }
       );
       toast.success('Booking cancelled successfully');
+      // the booking may be on an older page the refresh below doesn't cover
+      setBookings((prev) => prev.map((b) => (
+        b.id === bookingId ? { ...b, status: 'cancelled', status_display: 'Cancelled', can_cancel: false } : b
+      )));
       await fetchBookingStats();
       setConfirmDialog({ isOpen: false, bookingId: null });
     } catch (err) {
@@ -144,6 +180,17 @@ const UserBookings = ({ token, userId }) => {
           ))}
         </div>
       )}
+      {nextUrl && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className={`py-2 px-6 rounded font-medium transition-colors duration-200 disabled:opacity-50 ${isDark ? 'bg-gray-700 hover:bg-gray-600 text-gray-200' : 'bg-gray-200 hover:bg-gray-300 text-gray-800'}`}
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more bookings'}
+          </button>
+        </div>
+      )}
 
       {/* ✅ Modals */}
       <PaymentModal
@@ -152,6 +199,7 @@ const UserBookings = ({ token, userId }) => {
         fetchBookings={fetchBookingStats}
         fetchBookingStats={fetchBookingStats}
         isDark={isDark}
+        token={token}
       />
       <ConfirmationDialog
         isOpen={confirmDialog.isOpen}